@@ -4,6 +4,7 @@ from dash import Dash
 
 from src.components import layout
 from src.auxiliaries import callbacks
+from src.auxiliaries.registry import REGISTRY
 from src.auxiliaries.storage import CONFIG_APP, CONFIG_DATA
 
 
@@ -13,6 +14,9 @@ def main() -> None:
     i18n.set("locale", CONFIG_APP["user_language"])
     i18n.load_path.append("locale")
 
+    # Load bundled datasets once, to share them between all sessions
+    REGISTRY.load()
+
     # Create new app
     app = Dash(
         __name__,
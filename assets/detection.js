@@ -0,0 +1,95 @@
+// Clientside callbacks of the bottleneck detection
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    detection: {
+        /**
+         * Sync the x-axis ranges of the detection figures in the browser.
+         *
+         * The range of a zoomed (or reset) figure is set in the other figures
+         * without a round trip to the server. Only if the downsampled traces of
+         * a figure lack details in the new range (see `needsTraces`), the range
+         * is written to the x-axis range store, which asks the server for new
+         * traces (see update_plot_layouts).
+         */
+        syncXaxisRanges: function (
+            relayoutBottlenecks,
+            relayoutBufferLevel,
+            relayoutActivePeriods,
+            figureBottlenecks,
+            figureBufferLevel,
+            figureActivePeriods
+        ) {
+            const noUpdate = window.dash_clientside.no_update;
+            const triggered = window.dash_clientside.callback_context.triggered;
+            const relayouts = [relayoutBottlenecks, relayoutBufferLevel, relayoutActivePeriods];
+            const figures = [figureBottlenecks, figureBufferLevel, figureActivePeriods];
+            const ids = [
+                "detection-figure-bottlenecks",
+                "detection-figure-buffer-level",
+                "detection-figure-active-periods",
+            ];
+            const selection = ids.indexOf(triggered[0].prop_id.split(".")[0]);
+            const xaxisRange = getXaxisRange(relayouts[selection]);
+            if (selection < 0 || xaxisRange === undefined) {
+                return [noUpdate, noUpdate, noUpdate, noUpdate];
+            }
+
+            // The selected figure already shows the new range
+            const updates = figures.map((figure, i) =>
+                i === selection || !figure ? noUpdate : setXaxisRange(figure, xaxisRange)
+            );
+            const store = figures.some((figure) => needsTraces(figure, xaxisRange))
+                ? { xaxis_range: xaxisRange }
+                : noUpdate;
+            return [...updates, store];
+        },
+    },
+});
+
+// Get the new x-axis range from relayoutData, null on reset or undefined if unchanged
+function getXaxisRange(relayout) {
+    if (!relayout) {
+        return undefined;
+    }
+    if ("xaxis.range[0]" in relayout && "xaxis.range[1]" in relayout) {
+        return [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]];
+    }
+    if ("xaxis.range" in relayout) {
+        return relayout["xaxis.range"];
+    }
+    if (relayout["xaxis.autorange"]) {
+        return null;
+    }
+    return undefined;
+}
+
+// Copy a figure with a new x-axis range, leaving its traces untouched
+function setXaxisRange(figure, xaxisRange) {
+    const xaxis = Object.assign({}, figure.layout.xaxis);
+    if (xaxisRange === null) {
+        delete xaxis.range;
+        xaxis.autorange = true;
+    } else {
+        xaxis.range = xaxisRange;
+        xaxis.autorange = false;
+    }
+    const layout = Object.assign({}, figure.layout, { xaxis: xaxis });
+    return Object.assign({}, figure, { layout: layout });
+}
+
+// Check whether the server has more details of a figure for an x-axis range
+function needsTraces(figure, xaxisRange) {
+    // figures without meta data (see detection.get_meta) are not downsampled
+    const meta = figure && figure.layout && figure.layout.meta;
+    if (!meta) {
+        return false;
+    }
+    const [first, last] = meta.extent;
+    const [start, end] = xaxisRange === null ? meta.extent : xaxisRange;
+    const [loadedStart, loadedEnd] = meta.xaxis_range;
+    // traces are missing on either side of the loaded range
+    if (Math.max(start, first) < loadedStart || Math.min(end, last) > loadedEnd) {
+        return true;
+    }
+    // zoomed in far enough for downsampled traces to gain details
+    return meta.downsampled && 2 * (end - start) < loadedEnd - loadedStart;
+}
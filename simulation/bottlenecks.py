@@ -1,6 +1,10 @@
+import os
 import numpy as np
 import pandas as pd
 
+from .events import get_status
+from .files import read_frame, read_frame_chunks, _is_binary
+
 
 class Bottlenecks:
     def __init__(
@@ -9,12 +13,16 @@ class Bottlenecks:
     ):
         self.events = events
 
+    @classmethod
+    def from_file(cls, path: str) -> "Bottlenecks":
+        """Load the events from a binary (.npz) or csv file."""
+        events = read_frame(path)
+        if "status" not in events:
+            events["status"] = get_status(events)
+        return cls(events)
+
     def _get_event_length(self) -> int:
-        t_max = max(self.events["t"])
-        if t_max % 1 == 0:
-            return int(t_max)
-        else:
-            return int(t_max) + 1
+        return _get_num_steps(self.events["t"].max())
 
     def _get_event_stations(self, how: str) -> list:
         if how == "name":
@@ -24,50 +32,283 @@ class Bottlenecks:
         else:
             raise ValueError(f"{how} not accepted")
 
-    def _get_t_of_first_active(self, step: int, station: int) -> float:
-        subset = self.events[
-            (self.events["num_station"] == station) & (self.events["t"] <= step)
-        ]
-        t_first_active = 0
-        for _, step in subset[::-1].iterrows():
-            if step["status"] == "passive" or step["status"] == "init":
-                break
-            else:
-                t_first_active = step["t"]
-        return t_first_active
-
     def calc_active_periods(self) -> pd.DataFrame:
         events_length = self._get_event_length()
-        station_names = self._get_event_stations(how="name")
         station_nums = self._get_event_stations(how="num")
-        # create new resut df
-        active_periods = pd.DataFrame(
-            np.nan, index=range(events_length), columns=station_names
-        )
-        # iter over results and the time of the first active state
-        print(f"Calculating the active periods for all {len(station_names)} stations.")
-        for index, _ in active_periods.iterrows():
-            # print(f"- getting period resets: {index}/{events_length}", flush=True)
-            for station_name, station_num in zip(station_names, station_nums):
-                active_periods.loc[index, station_name] = self._get_t_of_first_active(
-                    index,
-                    station_num,
-                )
-
-        # repeat iteration to update active periods for all timesteps
-        for index, _ in active_periods.iterrows():
-            # print(f"- getting remaining time: {index}/{events_length}", flush=True)
-            for station_name, station_num in zip(station_names, station_nums):
-                if active_periods.loc[index, station_name] != 0:
-                    active_periods.loc[index, station_name] = (
-                        index - active_periods.loc[index, station_name]
-                    )
-                elif active_periods.loc[index, station_name] == 0 and index > 0:
-                    active_periods.loc[index, station_name] = (
-                        active_periods.loc[index - 1, station_name] + 1
-                    )
-                else:
-                    active_periods.loc[index, station_name] = 0
+
+        # sweep over the events of every station once
+        print(f"Calculating the active periods for all {len(station_nums)} stations.")
+        events = self.events[self.events["t"] <= events_length - 1]
+        return IncrementalBottlenecks(station_nums)._run(events, 0, events_length)
+
+
+class IncrementalBottlenecks:
+    """
+    Incremental calculation of the active periods from batches of new events.
+
+    Instead of recalculating all steps whenever events are appended (e.g. by a
+    growing event log or an extended simulation run), only the state after the
+    last calculated step is kept: the time of the first event of the current
+    active run of every station (NaN if its last event was not active) and its
+    last active period. Each batch then only costs work proportional to its own
+    size. Steps are calculated once all of their events are known, while events
+    at the latest time are held back until the next batch (or `finish`).
+
+    The stations have to be known upfront: in a growing log, downstream stations
+    only appear once their upstream station finished its first job, but their
+    active periods are part of every step from the start.
+
+    Parameters
+    ----------
+    station_nums : list[int]
+        Numbers of the stations, in the order of the columns of the result, e.g.
+        `[0, 1, 2, 3, 4]` for the stations S0 to S4 of a simulated line (the
+        order in which `Bottlenecks.calc_active_periods` finds them in the log).
+
+    Examples
+    --------
+    >>> bottlenecks = IncrementalBottlenecks(station_nums=[0, 1, 2, 3, 4])
+    >>> for events in batches:
+    ...     new_rows = bottlenecks.update(events)
+    >>> last_rows = bottlenecks.finish()
+    """
+
+    def __init__(self, station_nums: "list[int]"):
+        self.step: int = 0
+        self.t_max: float = -np.inf
+        self._pending: "list[pd.DataFrame]" = []
+        self.station_nums = list(station_nums)
+        self.station_names = [f"S{n}" for n in station_nums]
+        self.run_start = np.full(len(station_nums), np.nan)
+        self.last_period = np.zeros(len(station_nums))
+
+    def update(self, events: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add a batch of events and calculate the steps that are now complete.
+
+        Parameters
+        ----------
+        events : pd.DataFrame
+            New events with the columns "t", "num_station", "num_job" and
+            "event_type" (and optionally "status"), ordered by time and not
+            earlier than the events of the previous batches.
+
+        Returns
+        -------
+        pd.DataFrame
+            Active periods and bottleneck of the newly completed steps only.
+        """
+        if len(events) > 0:
+            self._pending.append(events)
+            self.t_max = max(self.t_max, float(events["t"].max()))
+        if not self._pending:
+            return self._run(self._get_empty_events(), self.step, 0)
+        # events at the last time may still be followed by more events at that
+        # time, so only the steps before are final
+        return self._run_pending(int(np.ceil(self.t_max)))
+
+    def finish(self) -> pd.DataFrame:
+        """Calculate the remaining steps, assuming that no more events follow."""
+        if not self._pending:
+            return self._run(self._get_empty_events(), self.step, 0)
+        return self._run_pending(_get_num_steps(self.t_max))
+
+    def _get_empty_events(self) -> pd.DataFrame:
+        return pd.DataFrame({"t": [], "num_station": [], "status": []})
+
+    def _run_pending(self, num_steps: int) -> pd.DataFrame:
+        num_steps = max(num_steps, self.step)
+        events = pd.concat(self._pending, ignore_index=True)
+        is_final = (events["t"] <= num_steps - 1).to_numpy()
+        self._pending = [events[~is_final]]
+        return self._run(events[is_final], self.step, num_steps - self.step)
+
+    def _run(
+        self, events: pd.DataFrame, first_step: int, num_steps: int
+    ) -> pd.DataFrame:
+        """Calculate the active periods of the next steps from their events."""
+        status = events["status"] if "status" in events else get_status(events)
+        is_active = np.asarray(status == "active", dtype=bool)
+        num_station = events["num_station"].to_numpy(dtype=np.int64)
+        t = events["t"].to_numpy(dtype=float)
+        unknown = np.setdiff1d(num_station, self.station_nums)
+        if len(unknown) > 0:
+            raise ValueError(f"station {unknown[0]} not accepted")
+
+        # group the events by station once, keeping them sorted by time
+        order = np.lexsort((t, num_station))
+        num_station, t, is_active = num_station[order], t[order], is_active[order]
+
+        steps = first_step + np.arange(num_steps)
+        active_periods = pd.DataFrame(index=steps)
+        for i, (name, num) in enumerate(zip(self.station_names, self.station_nums)):
+            first = np.searchsorted(num_station, num, side="left")
+            last = np.searchsorted(num_station, num, side="right")
+            periods, self.run_start[i] = _sweep_station(
+                t[first:last],
+                is_active[first:last],
+                steps,
+                self.run_start[i],
+                self.last_period[i],
+            )
+            if num_steps > 0:
+                self.last_period[i] = periods[-1]
+            active_periods[name] = periods
+        self.step = first_step + num_steps
+
         # determine bottleneck station
-        active_periods["bottleneck"] = active_periods.idxmax(axis=1)
+        active_periods["bottleneck"] = np.array(self.station_names, dtype=object)[
+            np.argmax(active_periods[self.station_names].to_numpy(), axis=1)
+        ]
         return active_periods
+
+
+def calc_active_periods_chunked(
+    path_events: str,
+    path_active_periods: str,
+    chunk_size: int = int(1e6),
+    station_nums: "list[int]" = None,
+) -> int:
+    """
+    Calculate the active periods of an event file in chunks, out of core.
+
+    The events are read in chunks of `chunk_size` rows and the active periods
+    are appended to file as soon as they are final, i.e. once all events up to
+    a step have been read. Only the current active run and the last active
+    period of every station are carried from one chunk to the next, so that
+    peak memory is bounded by the chunk size instead of the length of the
+    dataset. The result equals `Bottlenecks(events).calc_active_periods()`.
+
+    Parameters
+    ----------
+    path_events : str
+        File (and path) name of the events, ordered by time, either as csv or in
+        the binary format (.npz) of `simulation.files`. Both are streamed. If the
+        file has no "status" column, the status of the events is derived chunk
+        by chunk.
+    path_active_periods : str
+        File (and path) name of a csv file to append the active periods to.
+        Binary files cannot be appended to in chunks and are not accepted.
+    chunk_size : int, default 1000000
+        Number of events that are read from file at once.
+    station_nums : list[int], default None
+        Numbers of the stations, in the order of the columns of the result. If
+        None, the stations are read from file (in order of appearance) first.
+
+    Returns
+    -------
+    int
+        Number of steps (rows) written to file.
+    """
+    if _is_binary(path_active_periods):
+        raise ValueError(f"{path_active_periods} not accepted, use a csv file")
+    if station_nums is None:
+        station_nums = _get_station_nums(path_events, chunk_size)
+    print(f"Calculating the active periods for all {len(station_nums)} stations.")
+    bottlenecks = IncrementalBottlenecks(station_nums)
+    for events in read_frame_chunks(path_events, chunk_size):
+        _write_active_periods(bottlenecks.update(events), path_active_periods)
+    _write_active_periods(bottlenecks.finish(), path_active_periods)
+    return bottlenecks.step
+
+
+def _get_station_nums(path_events: str, chunk_size: int) -> "list[int]":
+    # stations in order of appearance, read without loading the whole file
+    station_nums = []
+    for chunk in read_frame_chunks(path_events, chunk_size, columns=["num_station"]):
+        for num in chunk["num_station"].unique().tolist():
+            if num not in station_nums:
+                station_nums.append(num)
+    return station_nums
+
+
+def _write_active_periods(active_periods: pd.DataFrame, path: str) -> None:
+    if len(active_periods) == 0:
+        return
+    # prevent overwriting
+    active_periods.to_csv(path, mode="a", header=not os.path.exists(path))
+
+
+def _get_num_steps(t_max: float) -> int:
+    if t_max % 1 == 0:
+        return int(t_max)
+    else:
+        return int(t_max) + 1
+
+
+def _sweep_station(
+    t: np.ndarray,
+    is_active: np.ndarray,
+    steps: np.ndarray,
+    run_start: float,
+    last_period: float,
+) -> "tuple[np.ndarray, float]":
+    """
+    Calculate the active periods of a single station for consecutive steps.
+
+    `t` and `is_active` describe the events of the station within the steps,
+    sorted by time. `run_start` and `last_period` are the state of the station
+    before the first step. Returns the active periods and the new `run_start`.
+    """
+    if len(steps) == 0:
+        return np.empty(0), run_start
+
+    # time of the first event in the active run of every event
+    index = np.arange(len(t))
+    last_break = np.maximum.accumulate(np.where(is_active, -1, index))
+    t_run_start = t[np.minimum(last_break + 1, max(len(t) - 1, 0))]
+    if not np.isnan(run_start):
+        # the active run of the previous steps continues
+        t_run_start[last_break < 0] = run_start
+    t_run_start = np.where(is_active, t_run_start, 0.0)
+
+    # start of the active period for every step, using the last event up to the
+    # step (i.e. with ceil(t) <= step), or 0 if the station is not active
+    num_events = np.cumsum(
+        np.bincount(np.ceil(t).astype(np.int64) - steps[0], minlength=len(steps))
+    )
+    t_first_active = np.full(len(steps), 0.0 if np.isnan(run_start) else run_start)
+    has_events = num_events > 0
+    t_first_active[has_events] = t_run_start[num_events[has_events] - 1]
+    if len(t) > 0:
+        run_start = t_run_start[-1] if is_active[-1] else np.nan
+
+    # while active, the period is measured from the first active event;
+    # otherwise, the last period keeps increasing by one per step
+    is_anchor = (t_first_active != 0) | (steps == 0)
+    index = np.arange(len(steps))
+    anchor = np.maximum.accumulate(np.where(is_anchor, index, -1))
+    anchor_values = np.where(t_first_active != 0, steps - t_first_active, 0.0)
+    periods = _add_ones(
+        np.where(anchor >= 0, anchor_values[anchor], last_period), index - anchor
+    )
+    return periods, run_start
+
+
+def _add_ones(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Add 1 to every value `counts` times, one addition at a time.
+
+    Repeated float additions round whenever the sum crosses a power of two,
+    so `value + count` can differ from the sequential sum in the last bit.
+    Between two powers of two the sum is exact, so only the crossings are
+    evaluated one by one.
+    """
+    result = values + counts
+    # sums that stay within the binade of the value are exact
+    pending = np.flatnonzero(np.frexp(result)[1] != np.frexp(values)[1])
+    current = values[pending].astype(float)
+    remaining = counts[pending].astype(np.int64)
+    while len(pending) > 0:
+        # number of additions until the next power of two is reached
+        to_boundary = np.ceil(np.ldexp(1.0, np.frexp(current)[1]) - current)
+        to_boundary = to_boundary.astype(np.int64)
+        crossing = remaining >= to_boundary
+        # exact up to the boundary, then a single rounded addition
+        current = current + np.where(crossing, to_boundary - 1, remaining)
+        current[crossing] += 1
+        remaining = np.where(crossing, remaining - to_boundary, 0)
+        result[pending] = current
+        keep = remaining > 0
+        pending, current, remaining = pending[keep], current[keep], remaining[keep]
+    return result
@@ -0,0 +1,157 @@
+import os
+import json
+import shutil
+import hashlib
+import inspect
+import numbers
+import tempfile
+import numpy as np
+import pandas as pd
+
+from .files import read_frame, write_frame
+from .simulation import ENGINE_VERSION, run_simulation
+
+# parameters that only name output files and do not change the results
+IGNORED_PARAMS = ["path_buffer", "path_events", "save_results"]
+RESULTS = ["buffer_levels", "events", "active_periods"]
+# version of the layout of the cached entries
+CACHE_VERSION = 2
+
+
+class SimulationCache:
+    """
+    Content-addressed disk cache for the results of simulation scenarios.
+
+    Every scenario is identified by a hash of the canonical json representation
+    of all parameters of `run_simulation` (including defaults, the seed and the
+    engine) and the version of the simulation code. Its buffer levels, events
+    and active periods are stored in a directory named by that hash, in the
+    binary columnar format of `simulation.files`. The original dtypes and index
+    of the results are stored alongside, so that a cached result equals the one
+    of a fresh run (instead of the compact dtypes of the binary format). If the
+    total size exceeds `max_size`, the least recently used scenarios are removed.
+
+    Scenarios without an integer seed are simulated with fresh entropy (or
+    from a seed sequence) and are not cached.
+
+    Parameters
+    ----------
+    path : str, default ".cache"
+        Directory of the cache.
+    max_size : int, default 1000000000
+        Maximum total size of all cached files in bytes.
+    """
+
+    def __init__(self, path: str = ".cache", max_size: int = int(1e9)):
+        self.path = path
+        self.max_size = max_size
+
+    def get_key(self, scenario: dict) -> "str | None":
+        """Get the hash of a scenario, or None if the scenario is not reproducible."""
+        params = inspect.signature(run_simulation).bind(**scenario)
+        params.apply_defaults()
+        params = {
+            name: value
+            for name, value in params.arguments.items()
+            if name not in IGNORED_PARAMS
+        }
+        if not isinstance(params["seed"], numbers.Integral):
+            return None
+        params["engine_version"] = ENGINE_VERSION
+        params["cache_version"] = CACHE_VERSION
+        canonical = json.dumps(
+            params,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=lambda value: np.asarray(value).tolist(),
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def __contains__(self, scenario: dict) -> bool:
+        """Check whether the results of a scenario are cached, without reading them."""
+        key = self.get_key(scenario)
+        return key is not None and os.path.isdir(os.path.join(self.path, key))
+
+    def get(
+        self, scenario: dict
+    ) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame] | None":
+        """Get the cached results of a scenario, or None if they are not cached."""
+        key = self.get_key(scenario)
+        if key is None or not os.path.isdir(os.path.join(self.path, key)):
+            return None
+        path = os.path.join(self.path, key)
+        # mark as recently used
+        os.utime(path)
+        with open(os.path.join(path, "dtypes.json")) as file:
+            dtypes = json.load(file)
+        return tuple(
+            _restore_dtypes(read_frame(os.path.join(path, f"{name}.npz")), dtypes[name])
+            for name in RESULTS
+        )
+
+    def put(
+        self,
+        scenario: dict,
+        results: "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]",
+    ) -> None:
+        """Store the buffer levels, events and active periods of a scenario."""
+        key = self.get_key(scenario)
+        if key is None or os.path.isdir(os.path.join(self.path, key)):
+            return
+        os.makedirs(self.path, exist_ok=True)
+        # write to a temporary directory first, so that no partial entries are
+        # visible to other processes
+        path = tempfile.mkdtemp(dir=self.path, prefix=".tmp-")
+        dtypes = {}
+        for name, frame in zip(RESULTS, results):
+            dtypes[name] = _get_dtypes(frame)
+            write_frame(
+                frame,
+                os.path.join(path, f"{name}.npz"),
+                index=dtypes[name]["index"] is not None,
+            )
+        with open(os.path.join(path, "dtypes.json"), "w") as file:
+            json.dump(dtypes, file)
+        try:
+            os.rename(path, os.path.join(self.path, key))
+        except OSError:
+            # stored by another process in the meantime
+            shutil.rmtree(path, ignore_errors=True)
+        self._evict()
+
+    def _evict(self) -> None:
+        # remove least recently used entries until the cache fits into max_size
+        entries = []
+        for key in os.listdir(self.path):
+            path = os.path.join(self.path, key)
+            if key.startswith(".tmp-") or not os.path.isdir(path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+            )
+            entries.append((os.path.getmtime(path), size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def _get_dtypes(frame: pd.DataFrame) -> dict:
+    # dtypes of the columns, and of the index unless it is a default RangeIndex
+    is_default = isinstance(frame.index, pd.RangeIndex) and frame.index.equals(
+        pd.RangeIndex(len(frame))
+    )
+    return {
+        "columns": {str(name): str(dtype) for name, dtype in frame.dtypes.items()},
+        "index": None if is_default else str(frame.index.dtype),
+        "index_name": frame.index.name,
+    }
+
+
+def _restore_dtypes(frame: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    if dtypes["index"] is not None:
+        index = frame.pop(frame.columns[0]).to_numpy()
+        frame.index = pd.Index(index, dtype=dtypes["index"], name=dtypes["index_name"])
+    return frame.astype(dtypes["columns"])
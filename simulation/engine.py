@@ -0,0 +1,293 @@
+import numpy as np
+import pandas as pd
+
+from .factory import Factory
+
+
+def simulate_fast(
+    factory: Factory,
+    simulation_time: int,
+    sample_interval: int = 1,
+    chunk_size: int = 2048,
+) -> "tuple[pd.DataFrame, pd.DataFrame]":
+    """
+    Simulate the serial line of a factory with a vectorized departure-time recursion.
+
+    The line built by `Factory` is a tandem line with finite buffers, blocking
+    after service and unlimited supply and demand. Let S, C and D be the start,
+    finish and departure time of job k at station i, with c0 = capa_init and
+    K = capa_max. Then
+
+        S_i(k) = max(D_i(k - 1), D_{i-1}(k - c0))
+        C_i(k) = S_i(k) + p_i(k)
+        D_i(k) = max(C_i(k), D_{i+1}(k - K + c0 - 1))
+
+    For a fixed neighbourhood, D_i is a max-plus recursion that is solved for a
+    whole chunk of jobs at once with a cumulative maximum. Since station i is
+    coupled to both of its neighbours, the chunk is solved by red-black sweeps
+    (even stations, then odd stations) that start from a lower bound and
+    increase monotonically until they reach the exact fixed point.
+
+    The process times are taken from the random streams of the stations of the
+    factory, so that the result equals the one of the SimPy simulation with the
+    same seed (apart from floating point rounding in the last digit). This only
+    holds as long as events of different stations (almost surely) never happen
+    at the same time: SimPy orders simultaneous events by its event queue, e.g.
+    relative to the restocking and sampling at every step. Hence, the
+    "empirical" distribution and process times of zero (e.g. of a "gaussian"
+    distribution with a large `std_dev`) are not accepted.
+
+    Parameters
+    ----------
+    factory : Factory
+        Factory that defines the process times, buffers and random streams.
+    simulation_time : int
+        Number of steps that the simulation will run for.
+    sample_interval : int, default 1
+        Number of steps between two samples of the buffer levels.
+    chunk_size : int, default 2048
+        Number of jobs per station that are solved at once.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The events (as written by the stations) and the buffer levels (as
+        sampled every `sample_interval` steps) of the simulation run.
+    """
+    return simulate_batch([factory], simulation_time, sample_interval, chunk_size)[0]
+
+
+def simulate_batch(
+    factories: "list[Factory]",
+    simulation_time: int,
+    sample_interval: int = 1,
+    chunk_size: int = 256,
+) -> "list[tuple[pd.DataFrame, pd.DataFrame]]":
+    """
+    Simulate several replications of the same serial line in lockstep.
+
+    All factories must share the topology of the line (number of stations,
+    `capa_init` and `capa_max`), but draw their process times from their own
+    random streams. The departure-time recursion of `simulate_fast` is solved
+    for all replications at once on arrays of shape (replications, stations,
+    jobs), so that small lines do not pay the overhead of one simulation (or
+    one process) per replication. Every replication gives the same result as
+    `simulate_fast` with its factory, with the same restrictions on the
+    distribution of the process times.
+
+    Parameters
+    ----------
+    factories : list[Factory]
+        One factory per replication, e.g. with different seeds.
+    simulation_time : int
+        Number of steps that the simulation will run for.
+    sample_interval : int, default 1
+        Number of steps between two samples of the buffer levels.
+    chunk_size : int, default 256
+        Number of jobs per station that are solved at once. The arrays grow with
+        the number of replications, so smaller chunks keep them in cache.
+
+    Returns
+    -------
+    list[tuple[pd.DataFrame, pd.DataFrame]]
+        The events and the buffer levels of every replication.
+    """
+    topologies = {(f.num_stations, f.capa_init, f.capa_max) for f in factories}
+    if len(topologies) > 1:
+        raise ValueError("factories with different topologies not accepted")
+    if any(factory.distribution == "empirical" for factory in factories):
+        raise ValueError(
+            "empirical distribution not accepted, its process times cause "
+            "simultaneous events, use the simpy engine"
+        )
+
+    start, finish, departure = _solve_departures(factories, simulation_time, chunk_size)
+    return [
+        (
+            _get_events(start[k], finish[k], simulation_time),
+            _get_buffer_levels(
+                factory, start[k], departure[k], simulation_time, sample_interval
+            ),
+        )
+        for k, factory in enumerate(factories)
+    ]
+
+
+def _solve_departures(
+    factories: "list[Factory]",
+    horizon: int,
+    chunk_size: int,
+) -> "tuple[np.ndarray, np.ndarray, np.ndarray]":
+    # start, finish and departure times with shape (replications, stations, jobs)
+    k = len(factories)
+    n = factories[0].num_stations
+    c0 = factories[0].capa_init
+    # lag of the blocking release by the downstream station
+    lag = factories[0].capa_max - c0 + 1
+    pad = max(lag, c0, 1)
+
+    streams = [
+        [station.process_times for station in factory.stations.values()]
+        for factory in factories
+    ]
+    rows = np.arange(n)
+    groups = [group for group in (rows[0::2], rows[1::2]) if len(group) > 0]
+    is_first = (rows == 0)[:, None]
+    is_last = (rows == n - 1)[:, None]
+
+    # departure times of the current chunk, preceded by the last `pad` departures
+    # of the previous chunk (initially zero, i.e. all stations idle at t=0)
+    window = np.zeros((k, n, pad + chunk_size))
+    starts, finishes, departures = [], [], []
+
+    while horizon > 0:
+        process = np.array(
+            [[stream.take(chunk_size) for stream in line] for line in streams]
+        ).reshape(k, n, chunk_size)
+        if (process <= 0).any():
+            raise ValueError(
+                "process times of zero not accepted, they cause simultaneous "
+                "events, use the simpy engine"
+            )
+        cumsum = np.cumsum(process, axis=2)
+        # start from a lower bound and increase until the fixed point is reached
+        window[:, :, pad:] = -np.inf
+        # replications that have not reached their fixed point yet
+        pending = np.arange(k)
+        while len(pending) > 0:
+            changed = np.zeros(len(pending), dtype=bool)
+            for group in groups:
+                sub = window[pending]
+                # arrival from upstream station (unlimited supply for the first)
+                arrival = sub[
+                    :, np.maximum(group - 1, 0), pad - c0 : pad - c0 + chunk_size
+                ]
+                arrival = np.where(is_first[group], 0.0, arrival)
+                # release by downstream station (unlimited demand for the last)
+                release = sub[
+                    :, np.minimum(group + 1, n - 1), pad - lag : pad - lag + chunk_size
+                ]
+                release = np.where(is_last[group], -np.inf, release)
+                # D_k = max(D_{k-1} + p_k, c_k) solved as a cumulative maximum
+                lower = np.maximum(arrival + process[pending][:, group], release)
+                x = np.maximum.accumulate(lower - cumsum[pending][:, group], axis=2)
+                x = np.maximum(x, sub[:, group, pad - 1][..., None])
+                x += cumsum[pending][:, group]
+                # (a - b) + b may be off by one ulp, so keep the bounds exact
+                np.maximum(x, lower, out=x)
+                changed |= (x != sub[:, group, pad:]).any(axis=(1, 2))
+                window[pending[:, None], group, pad:] = x
+            pending = pending[changed]
+
+        arrival = np.where(
+            is_first,
+            0.0,
+            window[:, np.maximum(rows - 1, 0), pad - c0 : pad - c0 + chunk_size],
+        )
+        start = np.maximum(window[:, :, pad - 1 : -1], arrival)
+        starts.append(start)
+        # a job cannot finish after its departure (guards against rounding)
+        finishes.append(np.minimum(start + process, window[:, :, pad:]))
+        departures.append(window[:, :, pad:].copy())
+        window[:, :, :pad] = window[:, :, -pad:]
+
+        # stop once every station has started a job after the horizon
+        if start[:, :, -1].min() >= horizon:
+            break
+
+    empty = np.empty((k, n, 0))
+    return (
+        np.concatenate(starts, axis=2) if starts else empty,
+        np.concatenate(finishes, axis=2) if finishes else empty,
+        np.concatenate(departures, axis=2) if departures else empty,
+    )
+
+
+def _get_buffer_levels(
+    factory: Factory,
+    start: np.ndarray,
+    departure: np.ndarray,
+    simulation_time: int,
+    sample_interval: int,
+) -> pd.DataFrame:
+    # buffer levels are sampled at step t before the events at t are processed
+    t = np.arange(sample_interval, simulation_time, sample_interval)
+    num_steps = simulation_time
+    n = factory.num_stations
+
+    def _count_per_step(times: np.ndarray) -> np.ndarray:
+        # number of times within [t - 1, t) for every step t
+        steps = np.floor(times[times < num_steps]).astype(np.int64)
+        return np.bincount(steps, minlength=num_steps)
+
+    def _count_before(times: np.ndarray) -> np.ndarray:
+        # number of times before t for every sampled step t
+        return np.cumsum(_count_per_step(times))[t - 1]
+
+    # first buffer is refilled to 'capa_inf' after every step
+    started = _count_per_step(start[0])
+    if len(started) > 0 and started.max() > factory.capa_inf:
+        raise ValueError(
+            f"supply of {factory.buffer_names[0]} is exhausted within one step, "
+            "increase 'capa_inf' or use the simpy engine"
+        )
+    levels = [factory.capa_inf - started[t - 1]]
+    for i in range(1, n):
+        levels.append(
+            factory.capa_init
+            + _count_before(departure[i - 1])
+            - _count_before(start[i])
+        )
+    levels.append(_count_before(departure[n - 1]))
+
+    buffer_levels = pd.DataFrame(dict(zip(factory.buffer_names, levels)))
+    buffer_levels.insert(0, "t", t)
+    return buffer_levels
+
+
+def _get_events(start: np.ndarray, finish: np.ndarray, horizon: float) -> pd.DataFrame:
+    n, num_jobs = start.shape
+    # per station, starts and finishes alternate and are already sorted
+    t = np.empty((n, 2 * num_jobs))
+    t[:, 0::2] = start
+    t[:, 1::2] = finish
+    num_job = np.repeat(np.arange(1, num_jobs + 1), 2)
+    is_finish = np.tile([False, True], num_jobs)
+
+    # on ties, finishes are logged before starts and downstream stations start
+    # before upstream stations (except for the initial starts at t=0, which
+    # follow the order of the stations). Arrange the events of all stations in
+    # this order, so that a stable sort by time merges them correctly.
+    is_ranked = is_finish | (t == 0)
+    logged = t < horizon
+    selection = [(i, logged[i] & is_ranked[i]) for i in range(n)]
+    selection += [(i, logged[i] & ~is_ranked[i]) for i in reversed(range(n))]
+
+    t = np.concatenate([t[i][mask] for i, mask in selection])
+    num_station = np.concatenate([np.full(mask.sum(), i) for i, mask in selection])
+    num_job = np.concatenate([num_job[mask] for _, mask in selection])
+    is_finish = np.concatenate([is_finish[mask] for _, mask in selection])
+
+    order = np.argsort(t, kind="stable")
+    return pd.DataFrame(
+        {
+            "t": _round(t[order], 3),
+            "num_station": num_station[order],
+            "num_job": num_job[order],
+            "event_type": pd.Categorical.from_codes(
+                is_finish[order].astype(np.int8),
+                categories=["job start", "job finish"],
+            ),
+        }
+    )
+
+
+def _round(values: np.ndarray, decimals: int) -> np.ndarray:
+    # np.round scales by 10**decimals first, which differs from the builtin
+    # `round` (used by the stations to log events) on values that are (almost)
+    # exactly halfway between two decimals
+    rounded = np.round(values, decimals)
+    scaled = values * 10**decimals
+    halfway = np.abs(scaled - np.floor(scaled) - 0.5) <= 4 * np.spacing(scaled)
+    rounded[halfway] = [round(value, decimals) for value in values[halfway].tolist()]
+    return rounded
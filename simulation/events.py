@@ -0,0 +1,171 @@
+import os
+import csv
+import numpy as np
+import pandas as pd
+
+from .files import write_frame, _is_binary
+
+
+class EventLog:
+    """
+    Columnar sink for the events emitted by the stations of a Factory.
+
+    Events are collected in one list per column and written to file in large
+    chunks instead of opening the file once per event. Without a path, the
+    complete log is kept in memory as a list of DataFrame chunks and no file is
+    written at all. Binary files (".npz") cannot be appended to in chunks, so
+    their events are kept in memory as well and the complete log is written on
+    `close` (replacing an existing file).
+
+    Parameters
+    ----------
+    path : str, default None
+        File (and path) name to append the events to, as csv or, with the
+        extension ".npz", in the binary format of `simulation.files`. If None,
+        the events are only kept in memory and can be retrieved with `to_frame`.
+    chunk_size : int, default 100000
+        Number of events to collect before they are flushed to file (or to a
+        compact in-memory chunk).
+    """
+
+    columns = ["t", "num_station", "num_job", "event_type"]
+
+    def __init__(self, path: str = None, chunk_size: int = int(1e5)):
+        self.path = path
+        self._in_memory = path is None or _is_binary(path)
+        self.chunk_size = chunk_size
+        self.num_events: int = 0
+        self._frames: "list[pd.DataFrame]" = []
+        self._clear()
+
+    def _clear(self) -> None:
+        self._t: "list[float]" = []
+        self._num_station: "list[int]" = []
+        self._num_job: "list[int]" = []
+        self._event_type: "list[str]" = []
+
+    def append(self, t: float, num_station: int, num_job: int, event_type: str) -> None:
+        self._t.append(t)
+        self._num_station.append(num_station)
+        self._num_job.append(num_job)
+        self._event_type.append(event_type)
+        self.num_events += 1
+        if len(self._t) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, events: pd.DataFrame) -> None:
+        """Add a complete DataFrame of events (e.g. from the fast engine) at once."""
+        self.flush()
+        self.num_events += len(events)
+        self._write(events[self.columns])
+
+    def flush(self) -> None:
+        """Write all collected events to file or to a compact in-memory chunk."""
+        if not self._t:
+            return
+        if self._in_memory:
+            self._write(
+                pd.DataFrame(
+                    {
+                        "t": self._t,
+                        "num_station": self._num_station,
+                        "num_job": self._num_job,
+                        "event_type": self._event_type,
+                    },
+                    columns=self.columns,
+                )
+            )
+        else:
+            # prevent overwriting
+            write_header = not os.path.exists(self.path)
+            with open(self.path, "a+", newline="") as f:
+                writer = csv.writer(f)
+                if write_header:
+                    writer.writerow(self.columns)
+                writer.writerows(
+                    zip(self._t, self._num_station, self._num_job, self._event_type)
+                )
+        self._clear()
+
+    def _write(self, frame: pd.DataFrame) -> None:
+        if self._in_memory:
+            self._frames.append(frame)
+        else:
+            frame.to_csv(
+                self.path,
+                mode="a",
+                header=not os.path.exists(self.path),
+                index=False,
+            )
+
+    def close(self) -> None:
+        """Write all remaining events to file (binary files are only written here)."""
+        self.flush()
+        if self.path is not None and self._in_memory and self._frames:
+            write_frame(pd.concat(self._frames, ignore_index=True), self.path)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return all events as DataFrame, reading back from file if necessary."""
+        self.close()
+        if not self._in_memory:
+            return pd.read_csv(self.path)
+        if not self._frames:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(self._frames, ignore_index=True)
+
+
+def get_status(events: pd.DataFrame) -> np.ndarray:
+    """
+    Derive the status ("init", "active" or "passive") of every event.
+
+    A job start is "active", unless it is the first job of a station ("init").
+    A job finish is "active" if the station starts its next job at the same
+    time, and "passive" otherwise (i.e. the station is starved or blocked).
+
+    The events of every station are ordered as start 1, finish 1, start 2, ...
+    so that the next job start of a finished job is found by shifting the
+    ordered events by one, instead of searching the whole log for every job.
+    This keeps the cost at O(n log n) for the sort and O(n) for the rest.
+
+    Parameters
+    ----------
+    events : pd.DataFrame
+        Events with the columns "t", "num_station", "num_job" and "event_type".
+
+    Returns
+    -------
+    np.ndarray
+        Status of every event, in the same order as the events.
+    """
+    if len(events) == 0:
+        return np.empty(0, dtype=object)
+    num_station = events["num_station"].to_numpy(dtype=np.int64)
+    num_job = events["num_job"].to_numpy(dtype=np.int64)
+    t = events["t"].to_numpy(dtype=float)
+    is_start = (events["event_type"] == "job start").to_numpy(dtype=bool)
+
+    # order the events of every station as start 1, finish 1, start 2, ...
+    position = 2 * num_job + ~is_start
+    order = np.argsort(num_station * (position.max() + 1) + position, kind="stable")
+    num_station, num_job, t, is_start = (
+        num_station[order],
+        num_job[order],
+        t[order],
+        is_start[order],
+    )
+
+    # a finished job is directly followed by the start of the next job
+    remains_active = np.zeros(len(order), dtype=bool)
+    remains_active[:-1] = (
+        (num_station[1:] == num_station[:-1])
+        & is_start[1:]
+        & (num_job[1:] == num_job[:-1] + 1)
+        & (t[1:] == t[:-1])
+    )
+
+    # 0: init, 1: active, 2: passive
+    codes = np.where(is_start, (num_job != 1).astype(int), 2 - remains_active)
+    # restore the original order of the events
+    status = np.empty(len(order), dtype=object)
+    status[order] = np.array(["init", "active", "passive"], dtype=object)[codes]
+    return status
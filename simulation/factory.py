@@ -1,6 +1,10 @@
+import copy
 import simpy
+import numpy as np
 
+from .events import EventLog
 from .station import Station
+from .variates import ProcessTimes, get_station_seeds
 
 
 class Factory:
@@ -13,6 +17,10 @@ class Factory:
         capa_init: int,
         capa_max: int,
         capa_inf: int,
+        event_log: EventLog = None,
+        seed: "int | np.random.SeedSequence" = None,
+        distribution: str = "exponential",
+        dist_params: dict = None,
     ):
         self.env = simpy.Environment()
         self.process_times = process_times
@@ -24,6 +32,14 @@ class Factory:
         self.capa_inf = capa_inf
         self.num_stations = len(process_times)
         self.num_buffers = self.num_stations + 1
+        # shared sink for the events of all stations
+        if event_log is None:
+            event_log = EventLog(path=path_events if save_results else None)
+        self.event_log = event_log
+        # one reproducible random stream per station
+        self.seed = seed
+        self.distribution = distribution
+        self.dist_params = {} if dist_params is None else dist_params
 
         self.station_names = [f"S{i}" for i in range(self.num_stations)]
         self.buffer_names = [f"B{i}" for i in range(self.num_buffers)]
@@ -41,34 +57,49 @@ class Factory:
                 self.buffer_names[n + 1]
             ]
 
-    def _buffer_selector(self, n):
+    def _buffer_selector(self, n, init: int = None):
         if n == 0:
             return simpy.Container(  # first buffer
-                env=self.env, capacity=float("inf"), init=self.capa_inf
+                env=self.env,
+                capacity=float("inf"),
+                init=self.capa_inf if init is None else init,
             )
         elif n == self.num_stations:
             return simpy.Container(  # last buffer
-                env=self.env, capacity=float("inf"), init=0
+                env=self.env, capacity=float("inf"), init=0 if init is None else init
             )
         else:
             return simpy.Container(
-                env=self.env, capacity=self.capa_max, init=self.capa_init
+                env=self.env,
+                capacity=self.capa_max,
+                init=self.capa_init if init is None else init,
             )
 
-    def _get_buffers(self) -> "dict[str, simpy.Container]":
+    def _get_buffers(self, levels: "list[int]" = None) -> "dict[str, simpy.Container]":
+        if levels is None:
+            levels = [None] * self.num_buffers
         return {
-            buffer_name: self._buffer_selector(int(buffer_name[1:]))
-            for buffer_name in self.buffer_names
+            buffer_name: self._buffer_selector(int(buffer_name[1:]), init=level)
+            for buffer_name, level in zip(self.buffer_names, levels)
         }
 
     def _get_stations(self) -> "dict[str, Station]":
+        station_seeds = get_station_seeds(self.seed, self.num_stations)
         return {
             station_name: Station(
                 process_time=pt,
                 station_name=station_name,
-                path_events=self.path_events,
+                event_log=self.event_log,
+                process_times=ProcessTimes(
+                    process_time=pt,
+                    distribution=self.distribution,
+                    seed=station_seed,
+                    **self.dist_params,
+                ),
+            )
+            for (station_name, pt, station_seed) in zip(
+                self.station_names, self.process_times, station_seeds
             )
-            for (station_name, pt) in zip(self.station_names, self.process_times)
         }
 
     def get_buffer_levels(self) -> "list[int]":
@@ -81,3 +112,91 @@ class Factory:
         curr_stock = self.buffers[self.buffer_names[0]].level
         if curr_stock < capa_inf:
             self.buffers[self.buffer_names[0]].put(capa_inf - curr_stock)
+
+    def run_restocker(self, env: simpy.Environment):
+        # the first restock of a restored factory is due right away
+        delay = 1 if env.now == 0 else np.ceil(env.now) - env.now
+        while True:
+            # reset level of 'B0' to 'capa_inf' once per time step
+            yield env.timeout(delay)
+            self.restock_customer(self.capa_inf)
+            delay = 1
+
+    def run_sampler(
+        self,
+        env: simpy.Environment,
+        buffer_levels: np.ndarray,
+        sample_times: np.ndarray,
+    ):
+        for row, t in enumerate(sample_times.tolist()):
+            # save current buffer levels to the preallocated array
+            yield env.timeout(t - env.now)
+            buffer_levels[row] = self.get_buffer_levels()
+
+    def get_checkpoint(self) -> dict:
+        """
+        Get the state of the factory, to continue its simulation later on.
+
+        The state consists of the current time, the buffer levels, the state,
+        finished jobs and end of the current job of every station, as well as
+        the random streams of the stations (including their generator state).
+        """
+        return {
+            "now": self.env.now,
+            "process_times": self.process_times,
+            "capa_init": self.capa_init,
+            "capa_max": self.capa_max,
+            "capa_inf": self.capa_inf,
+            "seed": self.seed,
+            "distribution": self.distribution,
+            "dist_params": self.dist_params,
+            "buffer_levels": self.get_buffer_levels(),
+            "stations": {
+                name: {
+                    "state": station.state,
+                    "finished_jobs": station.finished_jobs,
+                    "t_finish": station.t_finish,
+                    "process_times": copy.deepcopy(station.process_times),
+                }
+                for name, station in self.stations.items()
+            },
+        }
+
+    @classmethod
+    def from_checkpoint(
+        cls,
+        checkpoint: dict,
+        path_events: str = "events.csv",
+        path_buffer: str = "buffer.csv",
+        event_log: EventLog = None,
+    ) -> "Factory":
+        """
+        Restore a factory from a checkpoint (see `get_checkpoint`).
+
+        The environment of the restored factory starts at the time of the
+        checkpoint. Its stations have to be started with `resume=True` to
+        continue their current jobs.
+        """
+        factory = cls(
+            process_times=checkpoint["process_times"],
+            path_events=path_events,
+            path_buffer=path_buffer,
+            save_results=False,
+            capa_init=checkpoint["capa_init"],
+            capa_max=checkpoint["capa_max"],
+            capa_inf=checkpoint["capa_inf"],
+            event_log=EventLog() if event_log is None else event_log,
+            seed=checkpoint["seed"],
+            distribution=checkpoint["distribution"],
+            dist_params=checkpoint["dist_params"],
+        )
+        factory.env = simpy.Environment(initial_time=checkpoint["now"])
+        factory.buffers = factory._get_buffers(checkpoint["buffer_levels"])
+        for name, state in checkpoint["stations"].items():
+            station = factory.stations[name]
+            station.state = state["state"]
+            station.finished_jobs = state["finished_jobs"]
+            station.t_finish = state["t_finish"]
+            station.process_times = state["process_times"]
+        factory._update_stations()
+        return factory
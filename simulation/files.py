@@ -0,0 +1,239 @@
+import io
+import os
+import json
+import zipfile
+import numpy as np
+import pandas as pd
+
+from typing import Iterator
+
+# version of the schema that is stored alongside the columns of a binary file
+SCHEMA_VERSION = 1
+SCHEMA_KEY = "__schema__"
+
+
+def read_frame(
+    path: str,
+    columns: "list[str]" = None,
+    nrows: int = None,
+) -> pd.DataFrame:
+    """
+    Read a DataFrame from a binary (.npz) or csv file.
+
+    Binary files store every column as a separate array with a compact dtype,
+    so that only the requested columns are loaded and nothing is parsed. Text
+    columns (e.g. the event type or the bottleneck) are stored as integer codes
+    and returned as categorical columns. Any other file is read as csv.
+
+    Parameters
+    ----------
+    path : str
+        File (and path) name to read from. The format is chosen by extension.
+    columns : list[str], default None
+        Columns to read. If None, all columns are read.
+    nrows : int, default None
+        Number of rows to read. If None, all rows are read.
+
+    Returns
+    -------
+    pd.DataFrame
+        The columns of the file, in the order they were written.
+    """
+    if not _is_binary(path):
+        return pd.read_csv(path, usecols=columns, nrows=nrows)
+    return _read_binary(path, columns=columns, nrows=nrows)
+
+
+def read_frame_chunks(
+    path: str,
+    chunk_size: int,
+    columns: "list[str]" = None,
+) -> "Iterator[pd.DataFrame]":
+    """
+    Read a DataFrame from a binary (.npz) or csv file in chunks of rows.
+
+    The arrays of a binary file are streamed from the (compressed) archive, so
+    that only one chunk of every column is held in memory at a time, as with
+    `pd.read_csv(path, chunksize=chunk_size)` for csv files.
+
+    Parameters
+    ----------
+    path : str
+        File (and path) name to read from. The format is chosen by extension.
+    chunk_size : int
+        Number of rows per chunk.
+    columns : list[str], default None
+        Columns to read. If None, all columns are read.
+
+    Yields
+    ------
+    pd.DataFrame
+        The next `chunk_size` rows of the file.
+    """
+    if not _is_binary(path):
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+        return
+
+    with zipfile.ZipFile(path) as archive:
+        with archive.open(f"{SCHEMA_KEY}.npy") as file:
+            schema = json.loads(str(np.lib.format.read_array(file)))
+        if schema["version"] != SCHEMA_VERSION:
+            raise ValueError(f"schema version {schema['version']} not accepted")
+        selected = [
+            column
+            for column in schema["columns"]
+            if columns is None or column["name"] in columns
+        ]
+        files, num_rows = [], 0
+        try:
+            for column in selected:
+                file = archive.open(f"{column['key']}.npy")
+                files.append(file)
+                num_rows, dtype = _read_array_header(file)
+                column["dtype"] = dtype
+            for start in range(0, num_rows, chunk_size):
+                size = min(chunk_size, num_rows - start)
+                frame = {}
+                for column, file in zip(selected, files):
+                    values = np.frombuffer(
+                        file.read(size * column["dtype"].itemsize),
+                        dtype=column["dtype"],
+                    )
+                    if column["categories"] is not None:
+                        values = pd.Categorical.from_codes(values, column["categories"])
+                    frame[column["name"]] = values
+                yield pd.DataFrame(frame, index=pd.RangeIndex(start, start + size))
+        finally:
+            for file in files:
+                file.close()
+
+
+def _read_array_header(file: "io.BufferedIOBase") -> "tuple[int, np.dtype]":
+    # number of rows and dtype of a 1-d array in the .npy format
+    version = np.lib.format.read_magic(file)
+    if version == (1, 0):
+        shape, _, dtype = np.lib.format.read_array_header_1_0(file)
+    else:
+        shape, _, dtype = np.lib.format.read_array_header_2_0(file)
+    return shape[0], dtype
+
+
+def _read_binary(
+    file: "str | io.BytesIO",
+    columns: "list[str]" = None,
+    nrows: int = None,
+) -> pd.DataFrame:
+    with np.load(file, allow_pickle=False) as data:
+        schema = json.loads(str(data[SCHEMA_KEY]))
+        if schema["version"] != SCHEMA_VERSION:
+            raise ValueError(f"schema version {schema['version']} not accepted")
+        frame = {}
+        for column in schema["columns"]:
+            name = column["name"]
+            if columns is not None and name not in columns:
+                continue
+            values = data[column["key"]][:nrows]
+            if column["categories"] is not None:
+                values = pd.Categorical.from_codes(values, column["categories"])
+            frame[name] = values
+    return pd.DataFrame(frame)
+
+
+def write_frame(
+    frame: pd.DataFrame,
+    path: str,
+    index: bool = False,
+    compress: bool = True,
+) -> None:
+    """
+    Write a DataFrame to a binary (.npz) or csv file.
+
+    Numeric columns are stored with the smallest integer dtype that holds all
+    of their values (floats are kept as float64 to preserve them exactly), and
+    all other columns as integer codes of their categories. The schema of the
+    columns is stored in the same file. Any other extension is written as csv.
+    An existing file is overwritten.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        Data to write.
+    path : str
+        File (and path) name to write to. The format is chosen by extension.
+    index : bool, default False
+        Write the index as first column. As in csv files, an unnamed index is
+        read back as column "Unnamed: 0".
+    compress : bool, default True
+        Compress the arrays of a binary file.
+    """
+    if not _is_binary(path):
+        frame.to_csv(path, index=index)
+        return
+
+    if index:
+        frame = frame.reset_index(names=frame.index.name or "Unnamed: 0")
+    _write_binary(frame, path, compress=compress)
+
+
+def _write_binary(
+    frame: pd.DataFrame, file: "str | io.BytesIO", compress: bool = True
+) -> None:
+    arrays, schema = {}, {"version": SCHEMA_VERSION, "columns": []}
+    for i, (name, values) in enumerate(frame.items()):
+        key = f"c{i}"
+        values, categories = _to_compact(values)
+        arrays[key] = values
+        schema["columns"].append(
+            {"name": str(name), "key": key, "categories": categories}
+        )
+    arrays[SCHEMA_KEY] = np.array(json.dumps(schema))
+    save = np.savez_compressed if compress else np.savez
+    save(file, **arrays)
+
+
+def to_bytes(frame: pd.DataFrame, compress: bool = True) -> bytes:
+    """Encode a DataFrame in the binary format, e.g. to send it instead of csv."""
+    buffer = io.BytesIO()
+    _write_binary(frame, buffer, compress=compress)
+    return buffer.getvalue()
+
+
+def from_bytes(
+    data: bytes, columns: "list[str]" = None, nrows: int = None
+) -> pd.DataFrame:
+    """Decode a DataFrame from the binary format (see `to_bytes`)."""
+    return _read_binary(io.BytesIO(data), columns=columns, nrows=nrows)
+
+
+def convert(path_in: str, path_out: str, index: bool = False) -> None:
+    """Convert a file between the csv and the binary format (e.g. for export)."""
+    write_frame(read_frame(path_in), path_out, index=index)
+
+
+def _is_binary(path: str) -> bool:
+    return os.path.splitext(path)[1] == ".npz"
+
+
+def _to_compact(values: pd.Series) -> "tuple[np.ndarray, list | None]":
+    if pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=bool), None
+    if pd.api.types.is_integer_dtype(values):
+        values = values.to_numpy()
+        return values.astype(_get_int_dtype(values)), None
+    if pd.api.types.is_float_dtype(values):
+        return values.to_numpy(dtype=np.float64), None
+
+    # store text (and any other) columns as codes of their categories
+    values = pd.Categorical(values)
+    return values.codes.astype(_get_int_dtype(values.codes)), values.categories.tolist()
+
+
+def _get_int_dtype(values: np.ndarray) -> np.dtype:
+    # smallest signed integer type that holds all values
+    if len(values) == 0:
+        return np.dtype(np.int8)
+    for dtype in [np.int8, np.int16, np.int32]:
+        info = np.iinfo(dtype)
+        if info.min <= values.min() and values.max() <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
@@ -0,0 +1,169 @@
+import os
+import inspect
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .bottlenecks import Bottlenecks
+from .engine import simulate_batch
+from .events import EventLog, get_status
+from .factory import Factory
+from .simulation import run_pipeline, run_simulation, write_results
+
+
+def run_replications(
+    scenario: dict,
+    num_replications: int,
+    seed: int = None,
+    max_workers: int = None,
+    path_active_periods: str = "active_periods.csv",
+) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]":
+    """
+    Function to run independent replications of a scenario in parallel.
+
+    Every replication simulates the scenario and calculates its active periods
+    in a separate worker process. The random streams of the replications are
+    spawned from one run-level seed, so that they are independent of each other
+    and the combined result is reproducible regardless of the number of workers.
+
+    Parameters
+    ----------
+    scenario : dict
+        Keyword arguments of `run_simulation`, e.g. "process_times" and
+        "capa_max". A "seed" in the scenario is replaced by the seed of every
+        replication. If "save_results" is True (the default), the combined
+        results are written to "path_buffer" and "path_events".
+    num_replications : int
+        Number of replications to run.
+    seed : int, default None
+        Run-level seed from which the seeds of the replications are spawned. If
+        None, the replications are seeded with fresh entropy.
+    max_workers : int, default None
+        Number of worker processes. If None, one process per core is used.
+    path_active_periods : str, default "active_periods.csv"
+        File (and path) name to store the combined active periods.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The buffer levels, the events and the active periods of all
+        replications, with the number of the replication in the first column
+        "replication".
+    """
+    if num_replications < 1:
+        raise ValueError(f"{num_replications} replications not accepted")
+    scenario = dict(scenario)
+    save_results = scenario.pop("save_results", True)
+    seeds = np.random.SeedSequence(seed).spawn(num_replications)
+    scenarios = [{**scenario, "seed": seed, "save_results": False} for seed in seeds]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, num_replications)
+    print(f"Running {num_replications} replications with {max_workers} workers.")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(run_pipeline, scenarios))
+
+    return _combine_results(results, scenario, save_results, path_active_periods)
+
+
+def run_replications_batch(
+    scenario: dict,
+    num_replications: int,
+    seed: int = None,
+    path_active_periods: str = "active_periods.csv",
+) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]":
+    """
+    Function to run independent replications of a scenario in lockstep.
+
+    Instead of one process per replication, all replications are simulated at
+    once by `simulation.engine.simulate_batch`, which is much faster for the
+    many replications of small lines that are needed in sensitivity studies.
+    The seeds of the replications are spawned as in `run_replications`, so that
+    both functions give the same result. As with `engine="fast"`, process times
+    that cause simultaneous events (the "empirical" distribution or process
+    times of zero) are not accepted, see `simulation.engine.simulate_fast`.
+
+    Parameters
+    ----------
+    scenario : dict
+        Keyword arguments of `run_simulation`, e.g. "process_times" and
+        "capa_max". The "engine" and "seed" of the scenario are ignored. If
+        "save_results" is True (the default), the combined results are written
+        to "path_buffer" and "path_events".
+    num_replications : int
+        Number of replications to run.
+    seed : int, default None
+        Run-level seed from which the seeds of the replications are spawned. If
+        None, the replications are seeded with fresh entropy.
+    path_active_periods : str, default "active_periods.csv"
+        File (and path) name to store the combined active periods.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The buffer levels, the events and the active periods of all
+        replications, with the number of the replication in the first column
+        "replication".
+    """
+    if num_replications < 1:
+        raise ValueError(f"{num_replications} replications not accepted")
+    params = inspect.signature(run_simulation).bind(**scenario)
+    params.apply_defaults()
+    scenario = params.arguments
+    seeds = np.random.SeedSequence(seed).spawn(num_replications)
+    factories = [
+        Factory(
+            process_times=scenario["process_times"],
+            path_buffer=scenario["path_buffer"],
+            path_events=scenario["path_events"],
+            save_results=False,
+            capa_init=scenario["capa_init"],
+            capa_max=scenario["capa_max"],
+            capa_inf=scenario["capa_inf"],
+            event_log=EventLog(),
+            seed=seed,
+            distribution=scenario["distribution"],
+            dist_params=scenario["dist_params"],
+        )
+        for seed in seeds
+    ]
+
+    print(f"Running {num_replications} replications in lockstep.")
+    results = []
+    for events, buffer_levels in simulate_batch(
+        factories,
+        scenario["simulation_time"],
+        sample_interval=scenario["sample_interval"],
+    ):
+        events["status"] = get_status(events)
+        active_periods = Bottlenecks(events).calc_active_periods()
+        results.append((buffer_levels, events, active_periods))
+    return _combine_results(
+        results, scenario, scenario["save_results"], path_active_periods
+    )
+
+
+def _combine_results(
+    results: "list[tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]]",
+    scenario: dict,
+    save_results: bool,
+    path_active_periods: str,
+) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]":
+    # combine the results of all replications
+    combined = []
+    for frames in zip(*results):
+        for replication, frame in enumerate(frames):
+            frame.insert(0, "replication", replication)
+        combined.append(pd.concat(frames))
+    buffer_levels, events, active_periods = combined
+
+    if save_results:
+        write_results(
+            buffer_levels=buffer_levels,
+            events=events,
+            active_periods=active_periods,
+            path_buffer=scenario.get("path_buffer", "buffer.csv"),
+            path_events=scenario.get("path_events", "events.csv"),
+            path_active_periods=path_active_periods,
+        )
+    return buffer_levels, events, active_periods
@@ -1,9 +1,16 @@
-import os
-import csv
+import pickle
+import numpy as np
 import pandas as pd
 
+from .events import EventLog, get_status
 from .factory import Factory
-from .bottlenecks import Bottlenecks
+from .files import read_frame, write_frame
+from .engine import simulate_fast
+from .bottlenecks import Bottlenecks, IncrementalBottlenecks
+
+ENGINES = ["simpy", "fast"]
+# increase whenever a change of the simulation changes its results
+ENGINE_VERSION = 1
 
 
 def run_simulation(
@@ -15,7 +22,14 @@ def run_simulation(
     capa_init: int = 0,
     capa_max: int = 10,
     capa_inf: int = int(1e2),
-) -> None:
+    seed: "int | np.random.SeedSequence" = None,
+    distribution: str = "exponential",
+    dist_params: dict = None,
+    engine: str = "simpy",
+    sample_interval: int = 1,
+    path_checkpoint: str = None,
+    checkpoint_interval: int = None,
+) -> "tuple[pd.DataFrame, pd.DataFrame]":
     """
     Function to simulate a manufacturing line with fully connected stations.
 
@@ -30,15 +44,17 @@ def run_simulation(
         Process times for the created stations. Will determine the total number
         of stations and buffers in the simulation.
     simulation_time : int, default 1000
-        Number of steps that the simulation will run for. The progression of
-        the simulation is displayed using a simple progress bar.
+        Number of steps that the simulation will run for.
     path_buffer : str, default "buffer.csv"
         File (and path) name to store the buffer values of the simulation run.
+        Use the extension ".npz" to store them in the binary columnar format.
     path_events : str, default "events.csv"
-        File (and path) name to store every event of the simulation run.
+        File (and path) name to store every event of the simulation run. Use
+        the extension ".npz" to store them in the binary columnar format.
     save_results : bool, default True
         Parameter to execute the simulation without storing the buffer and
-        event results in a separate csv file.
+        event results in a separate file. The results are returned in
+        either case, the files are only written after the run is complete.
     capa_init : int, default 0
         Initial capacity of the simpy.Container that act as buffers in the
         simulation. Does not interfere with the later AP calculation, but helps
@@ -52,7 +68,43 @@ def run_simulation(
         be refilled once per time step to simulate a virtually unlimited
         supplier. This ensures that bottlenecks occur only due to throughput
         restrictions between stations, and not due to insufficient supply.
+    seed : int or np.random.SeedSequence, default None
+        Run-level seed from which an independent random stream is derived for
+        every station. Runs with the same seed are reproducible. If None, the
+        streams are seeded with fresh entropy.
+    distribution : str, default "exponential"
+        Distribution of the process times, either "exponential", "gaussian" or
+        "empirical". See `simulation.variates.ProcessTimes` for details.
+    dist_params : dict, default None
+        Additional keyword arguments for the distribution of the process times,
+        e.g. `std_dev` for "gaussian" or `samples` for "empirical".
+    engine : str, default "simpy"
+        Simulation engine, either "simpy" to run one SimPy process per station,
+        or "fast" to compute the same events and buffer levels with the
+        vectorized departure-time recursion in `simulation.engine`. The fast
+        engine runs several orders of magnitude faster on long runs, but does not
+        accept process times that cause simultaneous events (see
+        `simulation.engine.simulate_fast`).
+    sample_interval : int, default 1
+        Number of steps between two samples of the buffer levels. The buffer
+        levels are sampled before the events at the sampled step take place.
+    path_checkpoint : str, default None
+        File (and path) name to store a checkpoint of the factory at the end of
+        the run (and every `checkpoint_interval` steps), from which the run can
+        be extended with `extend_simulation`. Requires the simpy engine.
+    checkpoint_interval : int, default None
+        Number of steps between two checkpoints. If None, a checkpoint is only
+        stored at the end of the run.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The buffer levels and the events (including their status) of the run.
     """
+    if engine not in ENGINES:
+        raise ValueError(f"{engine} not accepted")
+    if engine == "fast" and path_checkpoint is not None:
+        raise ValueError("checkpoints require the simpy engine")
 
     # initialize factory
     factory = Factory(
@@ -63,79 +115,295 @@ def run_simulation(
         capa_init=capa_init,
         capa_max=capa_max,
         capa_inf=capa_inf,
+        seed=seed,
+        distribution=distribution,
+        dist_params=dist_params,
+        # keep the events in memory, they are written to file after the run
+        event_log=EventLog(),
     )
 
-    # run stations
-    for station in factory.stations.values():
-        factory.env.process(station.run_station(factory.env))
+    # run simulation
+    print(
+        f"Running simulation with {len(process_times)} stations for {simulation_time} steps. "
+    )
+    if engine == "fast":
+        events, buffer_levels = simulate_fast(
+            factory, simulation_time, sample_interval=sample_interval
+        )
+        factory.event_log.extend(events)
+    else:
+        buffer_levels = _run_simpy(
+            factory,
+            simulation_time,
+            sample_interval=sample_interval,
+            path_checkpoint=path_checkpoint,
+            checkpoint_interval=checkpoint_interval,
+        )
+
+    events = factory.event_log.to_frame()
+    events["status"] = get_status(events)
 
     # save?
     if save_results:
-        # prevent overwriting
-        if not os.path.exists(path_buffer):
-            write_new_row(path_buffer, ["t"] + factory.buffer_names)
-        # prevent overwriting
-        if not os.path.exists(path_events):
-            write_new_row(path_events, ["t", "num_station", "num_job", "event_type"])
+        write_results(
+            buffer_levels=buffer_levels,
+            events=events,
+            path_buffer=path_buffer,
+            path_events=path_events,
+        )
+    return buffer_levels, events
 
-    # run simulation
-    print(
-        f"Running simulation with {len(process_times)} stations for {simulation_time} steps. "
+
+def _run_simpy(
+    factory: Factory,
+    simulation_time: int,
+    sample_interval: int = 1,
+    path_checkpoint: str = None,
+    checkpoint_interval: int = None,
+    resume: bool = False,
+) -> pd.DataFrame:
+    env = factory.env
+    # run stations
+    for station in factory.stations.values():
+        env.process(station.run_station(env, resume=resume))
+    # sample buffer levels into a preallocated array
+    # note: events are collected by the event log of the factory
+    first = max(-(-env.now // sample_interval) * sample_interval, sample_interval)
+    sample_times = np.arange(first, simulation_time, sample_interval)
+    levels = np.zeros((len(sample_times), factory.num_buffers), dtype=np.int64)
+    env.process(factory.run_sampler(env, levels, sample_times))
+    # keep the supply virtually unlimited
+    env.process(factory.run_restocker(env))
+
+    # run in segments and store a checkpoint after every segment
+    stops = [simulation_time]
+    if checkpoint_interval is not None:
+        stops = list(range(int(env.now), simulation_time, checkpoint_interval))[1:]
+        stops.append(simulation_time)
+    for stop in stops:
+        env.run(until=stop)
+        if path_checkpoint is not None:
+            save_checkpoint(path_checkpoint, factory)
+
+    buffer_levels = pd.DataFrame(levels, columns=factory.buffer_names)
+    buffer_levels.insert(0, "t", sample_times)
+    return buffer_levels
+
+
+def extend_simulation(
+    path_checkpoint: str,
+    simulation_time: int,
+    sample_interval: int = 1,
+    checkpoint_interval: int = None,
+) -> "tuple[pd.DataFrame, pd.DataFrame]":
+    """
+    Function to extend a simulation run from its last checkpoint.
+
+    The factory is restored from the checkpoint, including its buffer levels,
+    the current jobs of its stations and the state of its random streams, and
+    simulated from the time of the checkpoint up to `simulation_time`. Except
+    for the order of events at the exact time of the checkpoint, the result
+    continues the original run as if it had been simulated for longer.
+
+    Parameters
+    ----------
+    path_checkpoint : str
+        File (and path) name of the checkpoint, e.g. as stored by
+        `run_simulation`. It is replaced by the checkpoint of the extended run.
+    simulation_time : int
+        Total number of steps of the extended run (including the steps before
+        the checkpoint).
+    sample_interval : int, default 1
+        Number of steps between two samples of the buffer levels.
+    checkpoint_interval : int, default None
+        Number of steps between two checkpoints. If None, a checkpoint is only
+        stored at the end of the run.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame]
+        The buffer levels and the events (including their status) from the
+        time of the checkpoint on.
+    """
+    checkpoint = load_checkpoint(path_checkpoint)
+    factory = Factory.from_checkpoint(checkpoint["factory"])
+    if simulation_time <= factory.env.now:
+        raise ValueError(f"{simulation_time} not after {factory.env.now}")
+    print(f"Extending simulation from {factory.env.now} to {simulation_time} steps.")
+    buffer_levels = _run_simpy(
+        factory,
+        simulation_time,
+        sample_interval=sample_interval,
+        path_checkpoint=path_checkpoint,
+        checkpoint_interval=checkpoint_interval,
+        resume=True,
     )
-    # for t in tqdm(range(1, simulation_time)):
-    for t in range(1, simulation_time):
-        # iterate one simulation step
-        factory.env.run(until=t)
-        # save current buffer levels to file
-        # note: events are written as they occur by each Station
-        _new_row = [t] + factory.get_buffer_levels()
-        write_new_row(path_buffer, _new_row)
-        # reset level of 'B0' to 'capa_inf'
-        factory.restock_customer(capa_inf)
+    events = factory.event_log.to_frame()
+    events["status"] = get_status(events)
+    return buffer_levels, events
 
-    events = get_events(path="events.csv")
-    events.to_csv("events.csv")
 
+def save_checkpoint(
+    path: str, factory: Factory, bottlenecks: IncrementalBottlenecks = None
+) -> None:
+    """Store the state of a factory (and of its active periods) in a file."""
+    checkpoint = {"factory": factory.get_checkpoint(), "bottlenecks": bottlenecks}
+    with open(path, "wb") as f:
+        pickle.dump(checkpoint, f)
 
-def write_new_row(path: str, row: list) -> None:
-    with open(path, "a+", newline="") as f:
-        csv.writer(f).writerow(row)
 
+def load_checkpoint(path: str) -> dict:
+    """Load a checkpoint as stored by `save_checkpoint`."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
 
-def get_events(path) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df["status"] = "init"
-
-    for index, event in df.iterrows():
-        # set 'status' to 'active' if a new job was started
-        if event["event_type"] == "job start" and event["num_job"] != 1:
-            df.loc[index, "status"] = "active"
-        elif event["event_type"] == "job finish":
-            _check_status = station_remains_active(
-                df, event["num_station"], event["num_job"]
-            )
-            if _check_status.size > 0 and _check_status:
-                df.loc[index, "status"] = "active"
-            else:
-                df.loc[index, "status"] = "passive"
+
+def run_pipeline(
+    scenario: dict,
+    path_active_periods: str = "active_periods.csv",
+    cache: "SimulationCache" = None,
+) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]":
+    """
+    Function to simulate a scenario and detect its bottlenecks in one pass.
+
+    The scenario is simulated, the status of the events is derived and the
+    active periods and bottlenecks are calculated, all in memory. The results
+    are only written to file as the last stage, if `save_results` is set in the
+    scenario, instead of passing them from one stage to the next as csv files.
+
+    Parameters
+    ----------
+    scenario : dict
+        Keyword arguments of `run_simulation`, e.g. "process_times" and
+        "simulation_time". The files are named by "path_buffer" and
+        "path_events" and written if "save_results" is True (the default).
+    path_active_periods : str, default "active_periods.csv"
+        File (and path) name to store the active periods of the simulation run.
+    cache : SimulationCache, default None
+        Cache to get the results of a repeated scenario from, instead of
+        simulating it again (see `simulation.cache`). Not used for scenarios
+        with a "path_checkpoint".
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The buffer levels, the events and the active periods (including the
+        bottleneck of every step) of the simulation run.
+    """
+    scenario = dict(scenario)
+    save_results = scenario.pop("save_results", True)
+    path_checkpoint = scenario.get("path_checkpoint")
+    if path_checkpoint is not None:
+        cache = None
+    results = None if cache is None else cache.get(scenario)
+    if results is None:
+        buffer_levels, events = run_simulation(**scenario, save_results=False)
+        if path_checkpoint is None:
+            active_periods = Bottlenecks(events).calc_active_periods()
         else:
-            # remain init for 'num_job' == 1
-            pass
-    return df
+            # keep the state of the active periods to continue them later on
+            station_nums = list(range(len(scenario["process_times"])))
+            bottlenecks = IncrementalBottlenecks(station_nums)
+            active_periods = bottlenecks.update(events)
+            _add_bottlenecks(path_checkpoint, bottlenecks)
+        if cache is not None:
+            cache.put(scenario, (buffer_levels, events, active_periods))
+    else:
+        buffer_levels, events, active_periods = results
+    if save_results:
+        write_results(
+            buffer_levels=buffer_levels,
+            events=events,
+            active_periods=active_periods,
+            path_buffer=scenario.get("path_buffer", "buffer.csv"),
+            path_events=scenario.get("path_events", "events.csv"),
+            path_active_periods=path_active_periods,
+        )
+    return buffer_levels, events, active_periods
 
 
-def station_remains_active(events, num_station, num_job) -> bool:
-    time_finish_last_job = events[
-        (events["num_station"] == num_station)
-        & (events["num_job"] == num_job)
-        & (events["event_type"] == "job finish")
-    ]["t"].values
-    time_start_next_job = events[
-        (events["num_station"] == num_station)
-        & (events["num_job"] == num_job + 1)
-        & (events["event_type"] == "job start")
-    ]["t"].values
-    return time_finish_last_job == time_start_next_job
+def extend_pipeline(
+    path_checkpoint: str,
+    simulation_time: int,
+    sample_interval: int = 1,
+    checkpoint_interval: int = None,
+) -> "tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]":
+    """
+    Function to extend a simulated scenario and its bottlenecks from a checkpoint.
+
+    The simulation is continued from the checkpoint (see `extend_simulation`)
+    and the active periods are calculated for the new events only, continuing
+    from the state of the active periods in the checkpoint. This requires a
+    checkpoint stored at the end of `run_pipeline` or `extend_pipeline`, the
+    periodic checkpoints of a run only hold the state of the factory.
+
+    Parameters
+    ----------
+    path_checkpoint : str
+        File (and path) name of the checkpoint. It is replaced by the checkpoint
+        of the extended run.
+    simulation_time : int
+        Total number of steps of the extended run (including the steps before
+        the checkpoint).
+    sample_interval : int, default 1
+        Number of steps between two samples of the buffer levels.
+    checkpoint_interval : int, default None
+        Number of steps between two checkpoints of the factory.
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The buffer levels, the events and the active periods of the extension,
+        to be appended to the results of the previous run(s).
+    """
+    bottlenecks = load_checkpoint(path_checkpoint)["bottlenecks"]
+    if bottlenecks is None:
+        raise ValueError(f"{path_checkpoint} has no active periods")
+    buffer_levels, events = extend_simulation(
+        path_checkpoint,
+        simulation_time,
+        sample_interval=sample_interval,
+        checkpoint_interval=checkpoint_interval,
+    )
+    active_periods = bottlenecks.update(events)
+    _add_bottlenecks(path_checkpoint, bottlenecks)
+    return buffer_levels, events, active_periods
+
+
+def _add_bottlenecks(path: str, bottlenecks: IncrementalBottlenecks) -> None:
+    checkpoint = load_checkpoint(path)
+    checkpoint["bottlenecks"] = bottlenecks
+    with open(path, "wb") as f:
+        pickle.dump(checkpoint, f)
+
+
+def write_results(
+    buffer_levels: pd.DataFrame = None,
+    events: pd.DataFrame = None,
+    active_periods: pd.DataFrame = None,
+    path_buffer: str = "buffer.csv",
+    path_events: str = "events.csv",
+    path_active_periods: str = "active_periods.csv",
+) -> None:
+    """
+    Write the given results of a simulation run to file.
+
+    Files with the extension ".npz" are written in the binary columnar format
+    of `simulation.files`, all other files as csv. Existing files are
+    overwritten, so that all files hold the results of the same run.
+    """
+    if buffer_levels is not None:
+        write_frame(buffer_levels, path_buffer)
+    if events is not None:
+        write_frame(events, path_events, index=True)
+    if active_periods is not None:
+        write_frame(active_periods, path_active_periods, index=True)
+
+
+def get_events(path) -> pd.DataFrame:
+    df = read_frame(path)
+    df["status"] = get_status(df)
+    return df
 
 
 # Just for testing
@@ -150,13 +418,7 @@ if __name__ == "__main__":
         "capa_max": 10,
         "capa_inf": int(1e2),
     }
-    # Run
-    run_simulation(**scenario)
-    # Load results from file
-    buffer_level = pd.read_csv("buffer.csv")
-    events = pd.read_csv("events.csv")
-    # Get active periods
-    bottlenecks = Bottlenecks(events)
-    active_periods = bottlenecks.calc_active_periods()
-    # Save
-    active_periods.to_csv("active_periods.csv")
+    # Run, get active periods and save
+    buffer_level, events, active_periods = run_pipeline(
+        scenario, path_active_periods="active_periods.csv"
+    )
@@ -1,18 +1,27 @@
-import csv
 import simpy
 
-from scipy.stats import expon
+from .events import EventLog
+from .variates import ProcessTimes
 
 
 class Station:
-    def __init__(self, process_time: float, station_name: str, path_events: str):
+    def __init__(
+        self,
+        process_time: float,
+        station_name: str,
+        event_log: EventLog,
+        process_times: ProcessTimes,
+    ):
         self.pt: float = process_time
         self.name = station_name
-        self.path_events = path_events
+        self.num = int(station_name[1:])
+        self.event_log = event_log
+        self.process_times = process_times
 
         self.buffer_get: simpy.Container
         self.buffer_put: simpy.Container
         self.finished_jobs: int = 0
+        self.t_finish: float = None
         self.break_down: bool = False
         self.state = "init"
 
@@ -25,7 +34,14 @@ class Station:
         }
         self.state = state_dict[new_state]
 
-    def run_station(self, env: simpy.Environment):
+    def run_station(self, env: simpy.Environment, resume: bool = False):
+        # continue the job of a station restored from a checkpoint
+        if resume and self.state == 0:
+            yield env.timeout(self.t_finish - env.now)
+            yield from self._finish_job(env)
+        elif resume and self.state == 2:
+            yield self.buffer_put.put(1)
+
         while True:
             # change state: waiting for material
             self._change_state("starved")
@@ -35,37 +51,25 @@ class Station:
             self._change_state("active")
             # time out while running
 
-            write_new_row(
-                path=self.path_events,
-                row=[
-                    round(env.now, 3),
-                    self.name[1:],
-                    self.finished_jobs + 1,
-                    "job start",
-                ],
-            )
-            yield env.timeout(self._apply_var(self.pt))
-            write_new_row(
-                path=self.path_events,
-                row=[
-                    round(env.now, 3),
-                    self.name[1:],
-                    self.finished_jobs + 1,
-                    "job finish",
-                ],
+            self.event_log.append(
+                round(env.now, 3), self.num, self.finished_jobs + 1, "job start"
             )
+            process_time = self._apply_var()
+            self.t_finish = env.now + process_time
+            yield env.timeout(process_time)
+            yield from self._finish_job(env)
 
-            self.finished_jobs += 1
-            # change state: returning material
-            self._change_state("blocked")
-            # return material
-            yield self.buffer_put.put(1)
-
-    def _apply_var(self, pt: float) -> float:
-        # return max(0, random.gauss(pt, pt*STD_DEV))
-        return max(0, expon.rvs(scale=pt, loc=pt, size=1)[0])
+    def _finish_job(self, env: simpy.Environment):
+        self.event_log.append(
+            round(env.now, 3), self.num, self.finished_jobs + 1, "job finish"
+        )
 
+        self.finished_jobs += 1
+        # change state: returning material
+        self._change_state("blocked")
+        # return material
+        yield self.buffer_put.put(1)
 
-def write_new_row(path: str, row: list) -> None:
-    with open(path, "a+", newline="") as f:
-        csv.writer(f).writerow(row)
+    def _apply_var(self) -> float:
+        # draw from the block-sampled random stream of the station
+        return next(self.process_times)
@@ -0,0 +1,171 @@
+import os
+import csv
+import json
+import hashlib
+import argparse
+import itertools
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .simulation import run_pipeline
+
+
+def get_scenarios(grid: dict) -> "list[dict]":
+    """
+    Get all scenarios of a parameter grid.
+
+    Parameters
+    ----------
+    grid : dict
+        Lists of values for keyword arguments of `run_simulation`, e.g.
+        `{"process_times": [[2, 2.25, 2], [2, 2, 2]], "capa_max": [5, 10]}`.
+        Every combination of values results in one scenario.
+
+    Returns
+    -------
+    list[dict]
+        Scenarios as keyword arguments of `run_simulation`.
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def get_scenario_id(scenario: dict) -> str:
+    """Get a short, stable id of a scenario from its canonical json representation."""
+    canonical = json.dumps(scenario, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def summarize(scenario: dict) -> dict:
+    """
+    Simulate a scenario and summarize its bottlenecks.
+
+    Returns the id of the scenario, the scenario itself (as json), the share of
+    steps in which every station was the bottleneck and the throughput of the
+    line (finished jobs of the last station per step).
+    """
+    _, events, active_periods = run_pipeline({**scenario, "save_results": False})
+    station_names = [f"S{i}" for i in range(len(scenario["process_times"]))]
+    share = active_periods["bottleneck"].value_counts(normalize=True)
+    is_output = (events["num_station"] == len(station_names) - 1) & (
+        events["event_type"] == "job finish"
+    )
+    return {
+        "scenario_id": get_scenario_id(scenario),
+        "scenario": json.dumps(scenario, sort_keys=True),
+        "throughput": is_output.sum() / max(len(active_periods), 1),
+        **{f"share_{name}": share.get(name, 0.0) for name in station_names},
+    }
+
+
+def run_sweep(
+    scenarios: "list[dict]",
+    path_results: str = "sweep.csv",
+    max_workers: int = None,
+) -> pd.DataFrame:
+    """
+    Function to run a sweep of scenarios and collect their bottleneck summaries.
+
+    The scenarios are scheduled on a pool of at most `max_workers` processes.
+    The summary of every scenario (see `summarize`) is appended to the results
+    table as soon as it is finished, so that an interrupted sweep can be
+    resumed: scenarios whose id is already in the results table are skipped.
+    A scenario that raises an error is reported and left out of the table, the
+    remaining scenarios are still run (and the failed one is run on resume).
+
+    Parameters
+    ----------
+    scenarios : list[dict]
+        Scenarios as keyword arguments of `run_simulation`, e.g. from
+        `get_scenarios`. Scenarios without a seed are simulated with fresh
+        entropy and will not be reproducible.
+    path_results : str, default "sweep.csv"
+        File (and path) name of the results table.
+    max_workers : int, default None
+        Maximum number of scenarios that run at the same time. If None, one per
+        core.
+
+    Returns
+    -------
+    pd.DataFrame
+        Results table with one row per scenario (including earlier runs).
+    """
+    # all share columns of the sweep, so that rows of different lines fit
+    num_stations = max([len(s["process_times"]) for s in scenarios], default=0)
+    columns = ["scenario_id", "scenario", "throughput"]
+    columns += [f"share_S{i}" for i in range(num_stations)]
+
+    done = set()
+    if os.path.exists(path_results):
+        results = pd.read_csv(path_results)
+        if not set(columns).issubset(results.columns):
+            raise ValueError(f"{path_results} does not match the scenarios")
+        columns = list(results.columns)
+        done = set(results["scenario_id"])
+    todo = [s for s in scenarios if get_scenario_id(s) not in done]
+    print(f"Running {len(todo)} of {len(scenarios)} scenarios ({len(done)} done).")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(summarize, scenario): scenario for scenario in todo}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as error:
+                # keep the other scenarios, the failed one is retried on resume
+                failed += 1
+                scenario_id = get_scenario_id(futures[future])
+                print(f"Scenario {scenario_id} failed: {error!r}")
+                continue
+            _append_row(row, path_results, columns)
+    if failed > 0:
+        print(f"{failed} of {len(todo)} scenarios failed and are not in the results.")
+    if not os.path.exists(path_results):
+        return pd.DataFrame(columns=columns)
+    return pd.read_csv(path_results)
+
+
+def _append_row(row: dict, path: str, columns: "list[str]") -> None:
+    # write every row right away, so that it is kept if the sweep is interrupted
+    write_header = not os.path.exists(path)
+    with open(path, "a+", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def _get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run a sweep over process times and buffer capacities."
+    )
+    parser.add_argument(
+        "--process-times",
+        nargs="+",
+        default=["2,2.25,2,2.25,2"],
+        help="comma-separated process times per scenario, e.g. 2,2.25,2",
+    )
+    parser.add_argument("--capa-max", nargs="+", type=int, default=[10])
+    parser.add_argument("--capa-init", nargs="+", type=int, default=[0])
+    parser.add_argument("--simulation-time", nargs="+", type=int, default=[10000])
+    parser.add_argument("--seed", nargs="+", type=int, default=[0])
+    parser.add_argument("--engine", default="fast")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--results", default="sweep.csv")
+    return parser
+
+
+if __name__ == "__main__":
+    args = _get_parser().parse_args()
+    grid = {
+        "process_times": [
+            [float(pt) for pt in times.split(",")] for times in args.process_times
+        ],
+        "simulation_time": args.simulation_time,
+        "capa_init": args.capa_init,
+        "capa_max": args.capa_max,
+        "seed": args.seed,
+        "engine": [args.engine],
+    }
+    run_sweep(get_scenarios(grid), path_results=args.results, max_workers=args.workers)
@@ -0,0 +1,106 @@
+import numpy as np
+
+DISTRIBUTIONS = ["exponential", "gaussian", "empirical"]
+
+
+class ProcessTimes:
+    """
+    Seedable random stream of process times for a single station.
+
+    Variates are drawn from NumPy in large blocks and handed out one by one,
+    so that the simulation does not call into the random number generator
+    for every job. All distributions scale with the nominal process time.
+
+    Parameters
+    ----------
+    process_time : float
+        Nominal process time of the station.
+    distribution : str, default "exponential"
+        Distribution of the process times, one of
+        - "exponential": process_time plus an exponential variate with mean
+          process_time (same as `expon(loc=pt, scale=pt)`).
+        - "gaussian": normal variate with mean process_time and standard
+          deviation process_time * std_dev, truncated at zero.
+        - "empirical": process_time multiplied with factors resampled from
+          `samples`, e.g. observed process times divided by their nominal value.
+    seed : int or np.random.SeedSequence, default None
+        Seed of the stream. If None, fresh entropy is used.
+    block_size : int, default 16384
+        Number of variates drawn at once whenever the current block is used up.
+    std_dev : float, default 0.1
+        Relative standard deviation of the "gaussian" distribution.
+    samples : list[float], default None
+        Relative process times for the "empirical" distribution.
+    """
+
+    def __init__(
+        self,
+        process_time: float,
+        distribution: str = "exponential",
+        seed: "int | np.random.SeedSequence" = None,
+        block_size: int = 2**14,
+        std_dev: float = 0.1,
+        samples: "list[float]" = None,
+    ):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"{distribution} not accepted")
+        if distribution == "empirical" and (samples is None or len(samples) == 0):
+            raise ValueError("empirical distribution requires samples")
+        self.pt = process_time
+        self.distribution = distribution
+        self.block_size = block_size
+        self.std_dev = std_dev
+        self.samples = None if samples is None else np.asarray(samples, dtype=float)
+        self.rng = np.random.default_rng(seed)
+
+        self._block = np.empty(0)
+        self._values: "list[float] | None" = None
+        self._pos: int = 0
+
+    def _draw_block(self) -> np.ndarray:
+        size = self.block_size
+        if self.distribution == "exponential":
+            return self.pt + self.rng.exponential(scale=self.pt, size=size)
+        elif self.distribution == "gaussian":
+            return np.maximum(0, self.rng.normal(self.pt, self.pt * self.std_dev, size))
+        else:
+            return self.pt * self.rng.choice(self.samples, size=size)
+
+    def _refill(self) -> None:
+        self._block = self._draw_block()
+        # scalar access is faster from a list, but only needed by `__next__`
+        self._values = None
+        self._pos = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> float:
+        if self._pos == len(self._block):
+            self._refill()
+        if self._values is None:
+            self._values = self._block.tolist()
+        value = self._values[self._pos]
+        self._pos += 1
+        return value
+
+    def take(self, n: int) -> np.ndarray:
+        """Return the next n variates of the stream as array."""
+        parts = [np.empty(0)]
+        while n > 0:
+            if self._pos == len(self._block):
+                self._refill()
+            part = self._block[self._pos : self._pos + n]
+            self._pos += len(part)
+            n -= len(part)
+            parts.append(part)
+        return np.concatenate(parts)
+
+
+def get_station_seeds(
+    seed: "int | np.random.SeedSequence | None", num_stations: int
+) -> "list[np.random.SeedSequence]":
+    """Derive one independent, reproducible seed per station from a run-level seed."""
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(num_stations)
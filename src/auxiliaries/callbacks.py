@@ -3,9 +3,9 @@ import i18n
 import base64
 import pandas as pd
 
-from dash import callback_context, html, dcc
-from dash.exceptions import NonExistentEventException
-from dash.dependencies import Input, Output, State
+from dash import callback_context, html, dcc, no_update
+from dash.exceptions import NonExistentEventException, PreventUpdate
+from dash.dependencies import ClientsideFunction, Input, Output, State
 
 from dash_bootstrap_components import Alert, Button, Tooltip
 
@@ -16,14 +16,29 @@ from ..components.detection import (
     plot_bottlenecks,
     plot_buffer_level,
     plot_active_periods,
+    get_buffer_level_traces,
+    get_active_periods_traces,
+    get_meta,
+    patch_figure,
 )
-from ..components.prediction import get_example, load_data
+from ..components.prediction import get_example
+from ..components.selection import render_job_progress, render_job_status
 
-from simulation.simulation import run_simulation
-from simulation.bottlenecks import Bottlenecks
 from ..page.sidebar import LinkName
+from ..auxiliaries.jobs import JobQueue, JobStatus
 from ..auxiliaries.options import Options
-from ..auxiliaries.storage import ConfigName
+from ..auxiliaries.storage import (
+    ConfigName,
+    to_store,
+    to_store_parsed,
+    from_store,
+    pyramid_from_store,
+)
+from ..auxiliaries.datasets import get_fingerprint
+from ..auxiliaries.registry import REGISTRY, DataName
+
+# simulations run as background jobs, so that no callback waits for them
+SIMULATION_JOBS = JobQueue(max_workers=1)
 
 
 def register(app):
@@ -157,6 +172,7 @@ def register(app):
             Output(ConfigName.active_periods, "data"),
             Output(ConfigName.buffer_level, "data"),
             Output("app-body-content-button-card", "children"),
+            Output(ConfigName.data, "data", allow_duplicate=True),
         ],
         [
             Input("app-body-button-data-selection", "n_clicks"),
@@ -178,13 +194,9 @@ def register(app):
         if button_clicked is not None:
             # If selected to use default data
             if config_data[ConfigName.source] == Options.selection[1]:
-                # Load example data from file (limiting to 10k to minimize loading times)
-                df_active_periods = pd.read_csv(
-                    "data/active_periods_10000.csv"
-                ).to_json(orient="split")
-                df_buffer_levels = pd.read_csv(
-                    "data/active_periods_10000.csv",
-                ).to_json(orient="split")
+                # Get example data from the registry (limited to 10k steps)
+                df_active_periods = REGISTRY.get_store_data(DataName.active_periods)
+                df_buffer_levels = REGISTRY.get_store_data(DataName.buffer_level)
                 # Set confirmation alert
                 confirmation = html.Div(
                     children=Alert(
@@ -199,34 +211,22 @@ def register(app):
                 scenario = {
                     "process_times": [2, 2.25, 2, 2.25, 2],
                     "simulation_time": 10000,
-                    "path_buffer": "buffer.csv",
-                    "path_events": "events.csv",
-                    "save_results": True,
+                    # the app only uses the returned data, no files are written
+                    "save_results": False,
                     "capa_init": 0,
                     "capa_max": 10,
                     "capa_inf": int(1e2),
+                    "seed": 0,
                 }
-                # Run
-                if False:  # temporary disabled
-                    run_simulation(**scenario)
-                    # Load results from file
-                    buffer_level = pd.read_csv("buffer.csv")
-                    events = pd.read_csv("events.csv")
-                    # Get active periods
-                    bottlenecks = Bottlenecks(events)
-                    active_periods = bottlenecks.calc_active_periods()
-
-                df_buffer_levels = {}  # place holder
-                df_active_periods = {}
+                # Run in the background, the data is set once the job is finished
+                job_id = SIMULATION_JOBS.submit(scenario)
+                config_data[ConfigName.job] = job_id
 
-                # Set confirmation alert
-                confirmation = html.Div(
-                    children=Alert(
-                        id="alert-default-data-loaded-successfully",
-                        children=i18n.t("selection.confirm-upload-simulation"),
-                        color="success",
-                    ),
-                )
+                df_buffer_levels = None  # place holder
+                df_active_periods = None
+
+                # Display progress of the simulation
+                confirmation = render_job_progress(SIMULATION_JOBS.get_status(job_id))
 
             # If selected to use custom data
             if config_data[ConfigName.source] == Options.selection[3]:
@@ -254,14 +254,71 @@ def register(app):
                         ),
                     )
             # Return loaded dataframes
-            return df_active_periods, df_buffer_levels, confirmation
+            return df_active_periods, df_buffer_levels, confirmation, config_data
 
         else:
             button = Button(
                 id="app-body-button-data-selection",
                 children=[i18n.t("selection.confirm-and-proceed")],
             )
-            return {}, {}, button
+            return None, None, button, config_data
+
+    # Poll the simulation job and set the data once it is finished
+    @app.callback(
+        Output(ConfigName.active_periods, "data", allow_duplicate=True),
+        Output(ConfigName.buffer_level, "data", allow_duplicate=True),
+        Output("app-body-simulation-job-progress", "children"),
+        Output("app-body-content-button-card", "children", allow_duplicate=True),
+        Input("app-body-interval-simulation-job", "n_intervals"),
+        State(ConfigName.data, "data"),
+        prevent_initial_call=True,
+    )
+    def update_simulation_job(n_intervals, config_data):
+        """
+        Update the progress of the simulation job and load its data when finished.
+
+        Parameters:
+            n_intervals (int): Number of times the status of the job was polled.
+            config_data (dict): A dictionary containing configuration data, including the job id.
+
+        Returns:
+            tuple: A tuple containing the active periods, the buffer levels, the progress and the
+            confirmation. The data is only updated once the job is finished.
+        """
+        job_id = config_data.get(ConfigName.job)
+        status = SIMULATION_JOBS.get_status(job_id)
+        # Display progress while the job is queued or running
+        if status["status"] in [JobStatus.queued, JobStatus.running]:
+            return no_update, no_update, render_job_status(status), no_update
+
+        if status["status"] == JobStatus.finished:
+            buffer_levels, active_periods = SIMULATION_JOBS.get_result(job_id)
+            # Keep the steps as first column, as in the files of the default data
+            active_periods = active_periods.reset_index(names="Unnamed: 0")
+            # Set confirmation alert
+            confirmation = html.Div(
+                children=Alert(
+                    id="alert-default-data-loaded-successfully",
+                    children=i18n.t("selection.confirm-upload-simulation"),
+                    color="success",
+                ),
+            )
+            return (
+                to_store(active_periods),
+                to_store(buffer_levels),
+                no_update,
+                confirmation,
+            )
+
+        # Set decline alert if the job failed or is unknown (e.g. after a restart)
+        confirmation = html.Div(
+            children=Alert(
+                id="alert-default-data-loaded-unsuccessfully",
+                children=i18n.t("selection.decline-upload-simulation"),
+                color="danger",
+            ),
+        )
+        return no_update, no_update, no_update, confirmation
 
     @app.callback(
         Output(ConfigName.buffer_level_upload, "data"),
@@ -275,10 +332,7 @@ def register(app):
         file_name,
     ):
         if df is not None:
-            _, df = df.split(",")
-            df = base64.b64decode(df)
-            df = pd.read_csv(io.StringIO(df.decode("utf-8")))
-            return df.to_json(orient="split"), file_name
+            return load_upload(df), file_name
         else:
             return None, i18n.t("selection.upload-button")
 
@@ -294,29 +348,38 @@ def register(app):
         file_name,
     ):
         if df is not None:
-            _, df = df.split(",")
-            df = base64.b64decode(df)
-            df = pd.read_csv(io.StringIO(df.decode("utf-8")))
-            return df.to_json(orient="split"), file_name
+            return load_upload(df), file_name
         else:
             return None, i18n.t("selection.upload-button")
 
+    # Detection: Sync the x-axis ranges of the figures in the browser
+    app.clientside_callback(
+        ClientsideFunction(namespace="detection", function_name="syncXaxisRanges"),
+        Output(DetectionName.fig_bottleneck, "figure", allow_duplicate=True),
+        Output(DetectionName.fig_buffer_level, "figure", allow_duplicate=True),
+        Output(DetectionName.fig_active_periods, "figure", allow_duplicate=True),
+        Output(DetectionName.xaxis_range, "data"),
+        Input(DetectionName.fig_bottleneck, "relayoutData"),
+        Input(DetectionName.fig_buffer_level, "relayoutData"),
+        Input(DetectionName.fig_active_periods, "relayoutData"),
+        State(DetectionName.fig_bottleneck, "figure"),
+        State(DetectionName.fig_buffer_level, "figure"),
+        State(DetectionName.fig_active_periods, "figure"),
+        prevent_initial_call=True,
+    )
+
     # Detection: Update figures according to selected data set
     @app.callback(
         Output(DetectionName.fig_bottleneck, "figure"),
         Output(DetectionName.fig_buffer_level, "figure"),
         Output(DetectionName.fig_active_periods, "figure"),
-        Input(DetectionName.fig_bottleneck, "relayoutData"),
-        Input(DetectionName.fig_buffer_level, "relayoutData"),
-        Input(DetectionName.fig_active_periods, "relayoutData"),
+        Input(DetectionName.xaxis_range, "data"),
         State(ConfigName.app, "data"),
         State(ConfigName.active_periods, "data"),
         State(ConfigName.buffer_level, "data"),
     )
     def update_plot_layouts(
-        relayout_bottlenecks,
-        relayout_buffer_level,
-        relayout_active_periods,
+        xaxis_range_data,
         config_app,
         df_active_periods,
         df_buffer_level,
@@ -324,74 +387,65 @@ def register(app):
         """
         Update the plot layouts after a user selection.
 
-        This callback function is triggered when the user interacts with the plot layouts for bottleneck analysis,
-        buffer levels, or active periods. It captures the user's selection, specifically the x-axis range,
-        and updates the respective figures with the new x-axis range if available. If no x-axis range is provided
-        or if an invalid selection is made, the figures are updated with the default x-axis range.
+        The x-axis ranges of the figures are synced in the browser (see assets/detection.js). This
+        callback is only triggered on first render and when the downsampled traces of the buffer levels
+        or active periods lack details in a new x-axis range, which the browser writes to the x-axis
+        range store. The traces are then sent as partial update (dash.Patch) for the new range, instead
+        of all figures from scratch.
 
         Parameters:
-            relayout_bottlenecks (dict): The relayoutData from the bottleneck figure.
-            relayout_buffer_level (dict): The relayoutData from the buffer level figure.
-            relayout_active_periods (dict): The relayoutData from the active periods figure.
+            xaxis_range_data (dict): The x-axis range that needs new traces, or None on first render.
             config_app (dict): A dictionary containing configuration settings for the application.
-            config_data (dict): A dictionary containing configuration data.
+            df_active_periods (str): The data of the active periods store.
+            df_buffer_level (str): The data of the buffer level store.
 
         Returns:
             tuple: A tuple containing updated figures for bottleneck analysis, buffer levels, and active periods.
 
         Notes:
             - This function is used as a callback to dynamically update the plots based on user interaction.
-            - It determines the x-axis range from the selected plot's relayoutData and updates all figures with
-            the same x-axis range.
-            - If no x-axis range is available or if an invalid selection is made, the default x-axis range is used.
+            - A range of None resets the figures to all data (e.g. after a double click).
         """
 
-        # Prepare data for visualization
-        df_active_periods = pd.read_json(df_active_periods, orient="split")
-        df_buffer_level = pd.read_json(df_buffer_level, orient="split")
+        # Get the parsed data (and its pyramids) from the server-side store (or the payload)
+        pyramid_active_periods = pyramid_from_store(df_active_periods)
+        pyramid_buffer_level = pyramid_from_store(df_buffer_level)
+        df_active_periods = from_store(df_active_periods)
+        df_buffer_level = from_store(df_buffer_level)
+        if df_active_periods is None or df_buffer_level is None:
+            raise PreventUpdate
 
-        # Get selection from callback context
-        selection = callback_context.triggered[0]["prop_id"].split(".")[0]
-        try:
-            # Determine the x-axis range from any of the scatter plots
-            xaxis_range = None
-            if selection == DetectionName.fig_bottleneck:
-                x1 = relayout_bottlenecks["xaxis.range[0]"]
-                x2 = relayout_bottlenecks["xaxis.range[1]"]
-                xaxis_range = [x1, x2]
-            elif selection == DetectionName.fig_buffer_level:
-                x1 = relayout_buffer_level["xaxis.range[0]"]
-                x2 = relayout_buffer_level["xaxis.range[1]"]
-                xaxis_range = [x1, x2]
-            elif selection == DetectionName.fig_active_periods:
-                x1 = relayout_active_periods["xaxis.range[0]"]
-                x2 = relayout_active_periods["xaxis.range[1]"]
-                xaxis_range = [x1, x2]
-
-            # Create new figures for all scatter plots with the same x-axis range
-            figure_bottlenecks = plot_bottlenecks(
-                df_active_periods,
-                config_app,
-                xaxis_range,
-            )
+        if xaxis_range_data is None:
+            # Create new figures for all scatter plots (e.g. on first render)
+            figure_bottlenecks = plot_bottlenecks(df_active_periods, config_app)
             figure_buffer_level = plot_buffer_level(
-                df_buffer_level,
-                config_app,
-                xaxis_range,
+                df_buffer_level, config_app, pyramid=pyramid_buffer_level
             )
             figure_active_periods = plot_active_periods(
-                df_active_periods,
-                config_app,
-                xaxis_range,
+                df_active_periods, config_app, pyramid=pyramid_active_periods
             )
-
-        except KeyError:
-            # Create new figures for all scatter plots with the same x-axis range
-            figure_bottlenecks = plot_bottlenecks(df_active_periods, config_app)
-            figure_buffer_level = plot_buffer_level(df_buffer_level, config_app)
-            figure_active_periods = plot_active_periods(df_active_periods, config_app)
-
-        return figure_bottlenecks, figure_buffer_level, figure_active_periods
+            return figure_bottlenecks, figure_buffer_level, figure_active_periods
+
+        # Only send the downsampled traces within the new x-axis range, the
+        # bottleneck states are complete and already synced in the browser
+        xaxis_range = xaxis_range_data["xaxis_range"]
+        traces_buffer_level = get_buffer_level_traces(
+            df_buffer_level, xaxis_range, pyramid=pyramid_buffer_level
+        )
+        traces_active_periods = get_active_periods_traces(
+            df_active_periods, xaxis_range, pyramid=pyramid_active_periods
+        )
+        figure_buffer_level = patch_figure(
+            xaxis_range,
+            traces_buffer_level,
+            get_meta(df_buffer_level, traces_buffer_level, xaxis_range),
+        )
+        figure_active_periods = patch_figure(
+            xaxis_range,
+            traces_active_periods,
+            get_meta(df_active_periods, traces_active_periods, xaxis_range),
+        )
+        return no_update, figure_buffer_level, figure_active_periods
 
     @app.callback(
         Output("prediction-results-plot", "figure"),
@@ -401,7 +455,7 @@ def register(app):
     def update_prediction_example(sample_number, config_app):
         if sample_number is None:
             sample_number = 13  # default example
-        x_test, y_test, predictions = load_data(path="data/", name="results")
+        x_test, y_test, predictions = REGISTRY.get(DataName.prediction_examples)
         return get_example(config_app, x_test, y_test, predictions, sample_number)
 
     @app.callback(
@@ -437,3 +491,14 @@ def register(app):
                 children=[i18n.t("prediction.button-run-prediction")],
                 style={"width": "100%", "margin-top": "1rem"},
             )
+
+
+def load_upload(contents: str) -> str:
+    """Parse an uploaded csv file (only once) and return the data of its dcc.Store."""
+
+    def parse() -> pd.DataFrame:
+        _, df = contents.split(",")
+        df = base64.b64decode(df)
+        return pd.read_csv(io.StringIO(df.decode("utf-8")))
+
+    return to_store_parsed(get_fingerprint(contents), parse)
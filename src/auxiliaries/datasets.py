@@ -0,0 +1,261 @@
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+
+from typing import Callable
+from collections import OrderedDict
+
+from simulation.files import read_frame, write_frame
+
+from .downsampling import build_frame_pyramid
+
+# ids of datasets are sha1 hex digests (see get_dataset_id)
+DATASET_ID = re.compile(r"[0-9a-f]{40}")
+
+
+class DatasetStore:
+    """
+    Server-side store for the datasets of the app sessions.
+
+    Instead of serializing the buffer levels and active periods into the
+    browser session, the dcc.Store of a session only holds the id of its
+    dataset. The parsed DataFrames are kept in memory, least recently used
+    first out: datasets that do not fit into `max_memory` are spilled to disk
+    in the binary columnar format of `simulation.files` and read back on the
+    next access. If the spilled files exceed `max_size`, the least recently
+    used ones are removed.
+
+    Datasets are identified by a hash of their content, so that the same data
+    (e.g. the default data of all sessions) is only stored once. The index of
+    a dataset is not kept. Payloads that a dataset is parsed from (uploaded
+    files or files on the server) are fingerprinted as well, so that every
+    payload is only parsed once (see `put_parsed`).
+
+    When a dataset is stored, the min/max pyramids of its columns are built
+    once (see `downsampling.build_pyramid`) and kept (and spilled) next to it.
+    Pyramids are built and files are read and written without holding the lock
+    of the store, so that large datasets do not block the callbacks of other
+    sessions.
+
+    Parameters:
+        path (str): Directory to spill datasets to.
+        max_memory (int): Maximum memory usage of all datasets in memory in bytes.
+        max_size (int): Maximum total size of all spilled files in bytes.
+        max_payloads (int): Maximum number of payload fingerprints to remember.
+    """
+
+    def __init__(
+        self,
+        path: str = ".datasets",
+        max_memory: int = int(5e8),
+        max_size: int = int(1e9),
+        max_payloads: int = 1000,
+    ):
+        self.path = path
+        self.max_memory = max_memory
+        self.max_size = max_size
+        self.max_payloads = max_payloads
+        self._frames = OrderedDict()
+        self._pyramids = {}
+        self._sizes = {}
+        self._payloads = OrderedDict()
+        # datasets removed from memory, but not yet written to disk
+        self._spilling = {}
+        # callbacks run in parallel threads
+        self._lock = threading.Lock()
+        # spilled files are written and removed by one thread at a time
+        self._disk_lock = threading.Lock()
+
+    def put(self, frame: pd.DataFrame) -> str:
+        """Store a DataFrame and return the id of the dataset."""
+        dataset_id = get_dataset_id(frame)
+        with self._lock:
+            if dataset_id in self._frames:
+                self._frames.move_to_end(dataset_id)
+                return dataset_id
+        frame = frame.reset_index(drop=True)
+        self._add(dataset_id, frame, build_frame_pyramid(frame))
+        return dataset_id
+
+    def put_parsed(self, fingerprint: str, parse: "Callable[[], pd.DataFrame]") -> str:
+        """
+        Store the DataFrame parsed from a payload, parsing every payload only once.
+
+        Parameters:
+            fingerprint (str): Fingerprint of the payload, see `get_fingerprint`.
+            parse (Callable): Function to parse the payload into a DataFrame. It is
+                only called if the payload is new or its dataset was removed.
+
+        Returns:
+            str: The id of the dataset.
+        """
+        with self._lock:
+            dataset_id = self._payloads.get(fingerprint)
+            if dataset_id is not None:
+                self._payloads.move_to_end(fingerprint)
+                if (
+                    dataset_id in self._frames
+                    or dataset_id in self._spilling
+                    or os.path.exists(self._get_path(dataset_id))
+                ):
+                    return dataset_id
+        dataset_id = self.put(parse())
+        with self._lock:
+            self._payloads[fingerprint] = dataset_id
+            while len(self._payloads) > self.max_payloads:
+                self._payloads.popitem(last=False)
+        return dataset_id
+
+    def get(self, dataset_id: str) -> "pd.DataFrame | None":
+        """Get a stored DataFrame by its id, or None if it is not available."""
+        # ids come from the browser, never turn anything else into a path
+        if not is_dataset_id(dataset_id):
+            return None
+        with self._lock:
+            if dataset_id in self._frames:
+                self._frames.move_to_end(dataset_id)
+                return self._frames[dataset_id]
+            if dataset_id in self._spilling:
+                return self._spilling[dataset_id][0]
+        try:
+            # mark as recently used and keep in memory again
+            path = self._get_path(dataset_id)
+            os.utime(path)
+            frame = read_frame(path)
+            pyramid = self._read_pyramid(dataset_id)
+        except FileNotFoundError:
+            return None
+        self._add(dataset_id, frame, pyramid)
+        return frame
+
+    def get_pyramid(self, dataset_id: str) -> "dict[str, list[np.ndarray]] | None":
+        """Get the min/max pyramids of the columns of a stored DataFrame by its id."""
+        # invalid ids are rejected by get
+        if self.get(dataset_id) is None:
+            return None
+        with self._lock:
+            if dataset_id in self._spilling:
+                return self._spilling[dataset_id][1]
+            return self._pyramids.get(dataset_id)
+
+    def _add(
+        self,
+        dataset_id: str,
+        frame: pd.DataFrame,
+        pyramid: "dict[str, list[np.ndarray]]",
+    ) -> None:
+        size = int(frame.memory_usage(deep=True).sum()) + sum(
+            level.nbytes for levels in pyramid.values() for level in levels
+        )
+        spilled = []
+        with self._lock:
+            if dataset_id in self._frames:
+                # added by another thread in the meantime
+                self._frames.move_to_end(dataset_id)
+                return
+            self._frames[dataset_id] = frame
+            self._pyramids[dataset_id] = pyramid
+            self._sizes[dataset_id] = size
+            # spill least recently used datasets, but always keep the newest one
+            while sum(self._sizes.values()) > self.max_memory and len(self._frames) > 1:
+                spilled_id, spilled_frame = self._frames.popitem(last=False)
+                del self._sizes[spilled_id]
+                spilled_pyramid = self._pyramids.pop(spilled_id)
+                self._spilling[spilled_id] = (spilled_frame, spilled_pyramid)
+                spilled.append((spilled_id, spilled_frame, spilled_pyramid))
+        # write to disk without holding the lock, spilled datasets are still
+        # returned from memory until their files are complete
+        for spilled_id, spilled_frame, spilled_pyramid in spilled:
+            self._spill(spilled_id, spilled_frame, spilled_pyramid)
+            with self._lock:
+                self._spilling.pop(spilled_id, None)
+
+    def _spill(
+        self,
+        dataset_id: str,
+        frame: pd.DataFrame,
+        pyramid: "dict[str, list[np.ndarray]]",
+    ) -> None:
+        path = self._get_path(dataset_id)
+        with self._disk_lock:
+            if os.path.exists(path):
+                return
+            os.makedirs(self.path, exist_ok=True)
+            # write the pyramid first, a dataset file is only visible once complete
+            levels = {
+                f"{i}:{col}": level
+                for col, col_levels in pyramid.items()
+                for i, level in enumerate(col_levels)
+            }
+            np.savez(self._get_path(dataset_id, "pyramid"), **levels)
+            path_tmp = os.path.join(self.path, f".tmp-{dataset_id}.npz")
+            write_frame(frame, path_tmp, compress=False)
+            os.replace(path_tmp, path)
+            self._evict()
+
+    def _read_pyramid(self, dataset_id: str) -> "dict[str, list[np.ndarray]]":
+        pyramid = {}
+        path = self._get_path(dataset_id, "pyramid")
+        if not os.path.exists(path):
+            return pyramid
+        with np.load(path) as data:
+            # levels are stored in order, from the smallest buckets
+            for key in data.files:
+                _, col = key.split(":", 1)
+                pyramid.setdefault(col, []).append(data[key])
+        return pyramid
+
+    def _evict(self) -> None:
+        # remove least recently used files until they fit into max_size
+        entries = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.startswith(".tmp-") or name.endswith(".pyramid.npz"):
+                continue
+            size = os.path.getsize(path)
+            path_pyramid = path.replace(".npz", ".pyramid.npz")
+            if os.path.exists(path_pyramid):
+                size += os.path.getsize(path_pyramid)
+            entries.append((os.path.getmtime(path), size, path, path_pyramid))
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, path, path_pyramid in sorted(entries):
+            if total <= self.max_size:
+                break
+            os.remove(path)
+            if os.path.exists(path_pyramid):
+                os.remove(path_pyramid)
+            total -= size
+
+    def _get_path(self, dataset_id: str, kind: str = None) -> str:
+        if kind is None:
+            return os.path.join(self.path, f"{dataset_id}.npz")
+        return os.path.join(self.path, f"{dataset_id}.{kind}.npz")
+
+
+def is_dataset_id(dataset_id: object) -> bool:
+    """Check whether a value has the format of a dataset id (see get_dataset_id)."""
+    return isinstance(dataset_id, str) and DATASET_ID.fullmatch(dataset_id) is not None
+
+
+def get_fingerprint(payload: "str | bytes") -> str:
+    """Get the fingerprint of a payload, e.g. the contents of an uploaded file."""
+    if isinstance(payload, str):
+        payload = payload.encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+def get_file_fingerprint(path: str) -> str:
+    """Get the fingerprint of a file from its path, size and modification time."""
+    stat = os.stat(path)
+    return get_fingerprint(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+
+
+def get_dataset_id(frame: pd.DataFrame) -> str:
+    """Get the id of a dataset from a hash of its columns and values."""
+    digest = hashlib.sha1()
+    digest.update(repr(list(frame.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+
+# Number of points per trace, about twice the width of a plot in pixels
+MAX_POINTS = 2000
+# Smallest buckets of a pyramid, finer levels would keep (almost) all rows
+MIN_LEVEL = 2
+
+
+def get_visible_rows(x: np.ndarray, xaxis_range: list = None) -> slice:
+    """
+    Get the rows of a time series that are visible in the given x-axis range.
+
+    Parameters:
+        x (np.ndarray): Time of every row, sorted in ascending order.
+        xaxis_range (list, optional): The range of x-axis values of the plot. Default is None (all rows).
+
+    Returns:
+        slice: The visible rows, including one more row on each side so that lines reach the edges.
+    """
+    if xaxis_range is None:
+        return slice(0, len(x))
+    first = np.searchsorted(x, xaxis_range[0], side="left")
+    last = np.searchsorted(x, xaxis_range[1], side="right")
+    return slice(max(first - 1, 0), min(last + 1, len(x)))
+
+
+def downsample(
+    x: np.ndarray,
+    y: np.ndarray,
+    max_points: int = MAX_POINTS,
+) -> "tuple[np.ndarray, np.ndarray]":
+    """
+    Reduce a time series to at most `max_points` points, keeping its peaks.
+
+    The series is split into buckets of consecutive rows and only the minimum and
+    the maximum of every bucket are kept (in their original order). Hence, peaks
+    remain visible, unlike with plain decimation. Series with at most `max_points`
+    points are returned at full resolution.
+
+    Parameters:
+        x (np.ndarray): Time of every row, sorted in ascending order.
+        y (np.ndarray): Value of every row.
+        max_points (int): Maximum number of points of the result.
+
+    Returns:
+        tuple: The time and value of the kept rows.
+    """
+    if len(y) <= max_points:
+        return x, y
+    rows = get_minmax_rows(y, max(max_points // 2, 1))
+    return x[rows], y[rows]
+
+
+def get_minmax_rows(y: np.ndarray, num_buckets: int) -> np.ndarray:
+    """Get the sorted rows of the minimum and maximum of `num_buckets` buckets of a series."""
+    bucket_size = -(-len(y) // num_buckets)
+    num_full = len(y) // bucket_size
+    # buckets of equal size, plus a last bucket with the remaining rows
+    full = y[: num_full * bucket_size].reshape(num_full, bucket_size)
+    offsets = np.arange(num_full) * bucket_size
+    rows = [offsets + np.argmin(full, axis=1), offsets + np.argmax(full, axis=1)]
+    if num_full * bucket_size < len(y):
+        rest = y[num_full * bucket_size :]
+        offset = num_full * bucket_size
+        rows.append(np.array([offset + np.argmin(rest), offset + np.argmax(rest)]))
+    return np.unique(np.concatenate(rows))
+
+
+def downsample_rows(
+    x: np.ndarray,
+    y: np.ndarray,
+    rows: slice,
+    max_points: int = MAX_POINTS,
+    pyramid: "list[np.ndarray]" = None,
+) -> "tuple[np.ndarray, np.ndarray]":
+    """
+    Reduce the given rows of a time series to at most about `max_points` points.
+
+    With a pyramid of the series (see `build_pyramid`), the minimum and maximum of
+    every bucket are looked up on the finest level that does not exceed `max_points`,
+    so that the costs depend on `max_points` only and not on the number of rows.
+    Without a pyramid, or for few rows, the rows are reduced by `downsample`.
+
+    Parameters:
+        x (np.ndarray): Time of every row, sorted in ascending order.
+        y (np.ndarray): Value of every row.
+        rows (slice): The rows to reduce, e.g. from `get_visible_rows`.
+        max_points (int): Maximum number of points of the result.
+        pyramid (list, optional): The pyramid of `y`. Default is None.
+
+    Returns:
+        tuple: The time and value of the kept rows.
+    """
+    first, last = rows.start, rows.stop
+    num_buckets = max(max_points // 2, 1)
+    bucket_size = -(-(last - first) // num_buckets)
+    if not pyramid or bucket_size < 2**MIN_LEVEL:
+        return downsample(x[rows], y[rows], max_points)
+
+    # finest level with buckets that are at least as large as required
+    level = min(int(np.ceil(np.log2(bucket_size))), MIN_LEVEL + len(pyramid) - 1)
+    buckets = pyramid[level - MIN_LEVEL][first >> level : ((last - 1) >> level) + 1]
+    keep = np.unique(buckets.ravel())
+    keep = keep[(keep >= first) & (keep < last)]
+    return x[keep], y[keep]
+
+
+def build_pyramid(
+    y: np.ndarray,
+    max_points: int = MAX_POINTS,
+    chunk_size: int = 2**20,
+) -> "list[np.ndarray]":
+    """
+    Build the min/max pyramid of a time series.
+
+    Every level of the pyramid holds the rows of the minimum and the maximum of
+    buckets of 2**k consecutive rows, from k = MIN_LEVEL up to the level at which
+    the whole series fits into `max_points`. The series is processed in chunks of
+    about `chunk_size` rows, aligned to the largest buckets, and every level is
+    derived from the level below, so that each row is only read once.
+
+    Parameters:
+        y (np.ndarray): Value of every row.
+        max_points (int): Maximum number of points that are displayed per trace.
+        chunk_size (int): Number of rows that are processed at once.
+
+    Returns:
+        list: One array per level with the rows of the minimum and maximum of every bucket.
+    """
+    num_buckets = max(max_points // 2, 1)
+    max_level = MIN_LEVEL
+    while -(-len(y) // 2**max_level) > num_buckets:
+        max_level += 1
+    if len(y) <= max_points:
+        return []
+
+    chunk_size = max(chunk_size // 2**max_level, 1) * 2**max_level
+    levels = [[] for _ in range(MIN_LEVEL, max_level + 1)]
+    for start in range(0, len(y), chunk_size):
+        rows = start + get_bucket_rows(y[start : start + chunk_size], 2**MIN_LEVEL)
+        levels[0].append(rows)
+        for level in levels[1:]:
+            rows = merge_buckets(y, rows)
+            level.append(rows)
+    dtype = np.int32 if len(y) < 2**31 else np.int64
+    return [np.concatenate(level).astype(dtype) for level in levels]
+
+
+def build_frame_pyramid(df: pd.DataFrame) -> "dict[str, list[np.ndarray]]":
+    """Build the pyramids of all numeric columns of a DataFrame, except for the time (first column)."""
+    return {
+        col: build_pyramid(df[col].to_numpy())
+        for col in df.columns[1:]
+        if pd.api.types.is_numeric_dtype(df[col])
+    }
+
+
+def get_bucket_rows(y: np.ndarray, bucket_size: int) -> np.ndarray:
+    """Get the rows of the minimum and maximum of consecutive buckets of a series."""
+    num_full = len(y) // bucket_size
+    full = y[: num_full * bucket_size].reshape(num_full, bucket_size)
+    offsets = np.arange(num_full) * bucket_size
+    rows = np.stack(
+        [offsets + np.argmin(full, axis=1), offsets + np.argmax(full, axis=1)], axis=1
+    )
+    if num_full * bucket_size < len(y):
+        rest = y[num_full * bucket_size :]
+        offset = num_full * bucket_size
+        rest_rows = [[offset + np.argmin(rest), offset + np.argmax(rest)]]
+        rows = np.concatenate([rows, rest_rows])
+    return rows
+
+
+def merge_buckets(y: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """Merge pairs of consecutive buckets (see `get_bucket_rows`) into buckets of twice the size."""
+    num_pairs = len(rows) // 2
+    left, right = rows[0 : 2 * num_pairs : 2], rows[1 : 2 * num_pairs : 2]
+    # keep the first row of equal values, as np.argmin and np.argmax do
+    mins = np.where(y[right[:, 0]] < y[left[:, 0]], right[:, 0], left[:, 0])
+    maxs = np.where(y[right[:, 1]] > y[left[:, 1]], right[:, 1], left[:, 1])
+    merged = np.stack([mins, maxs], axis=1)
+    if len(rows) % 2 == 1:
+        merged = np.concatenate([merged, rows[-1:]])
+    return merged
@@ -0,0 +1,147 @@
+import time
+import uuid
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation.simulation import run_pipeline
+from simulation.cache import SimulationCache
+
+
+class JobStatus:
+    # Name for the status of a background job
+    queued = "queued"
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+    unknown = "unknown"
+
+
+class JobQueue:
+    """
+    Simple queue to run simulations as background jobs of the app.
+
+    Jobs are run one after the other (or `max_workers` at the same time) in a
+    separate worker process, so that neither the callbacks nor the other users
+    of the app have to wait for a simulation. Callbacks only submit a job and
+    poll its status by the returned job id.
+
+    Finished jobs and their results are kept for `ttl` seconds, so that repeated
+    polls still get the result of a job, and removed afterwards (e.g. if the
+    session of a job is gone before its result was fetched).
+
+    Parameters:
+        max_workers (int): Maximum number of simulations that run at the same time.
+        seconds_per_step (float): Initial estimate of the run time per simulation
+            step, used for the progress and ETA of a job. It is updated with the
+            run time of every simulated job (results from the cache are skipped).
+        ttl (float): Number of seconds that finished jobs are kept.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        seconds_per_step: float = 1e-4,
+        ttl: float = 600,
+    ):
+        self.max_workers = max_workers
+        self.seconds_per_step = seconds_per_step
+        self.ttl = ttl
+        self.jobs = {}
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # start the worker on first use, not when the app is imported
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def submit(
+        self, scenario: dict, path_active_periods: str = "active_periods.csv"
+    ) -> str:
+        """Submit the simulation of a scenario and return the id of its job."""
+        self._remove_expired()
+        job_id = uuid.uuid4().hex
+        future = self._get_executor().submit(
+            run_job, scenario, path_active_periods=path_active_periods
+        )
+        job = {
+            "future": future,
+            "steps": scenario.get("simulation_time", 1000),
+            "started": None,
+            "finished": None,
+        }
+        self.jobs[job_id] = job
+        future.add_done_callback(lambda _: self._set_finished(job))
+        return job_id
+
+    def get_status(self, job_id: str) -> dict:
+        """
+        Get the status of a job, including its estimated progress.
+
+        Parameters:
+            job_id (str): Id of the job, as returned by `submit`.
+
+        Returns:
+            dict: The status of the job (see `JobStatus`), its progress as share
+                between 0 and 1, and the estimated remaining time in seconds.
+        """
+        self._remove_expired()
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"status": JobStatus.unknown, "progress": 0.0, "eta": None}
+        future = job["future"]
+        if future.done():
+            status = JobStatus.failed if future.exception() else JobStatus.finished
+            return {"status": status, "progress": 1.0, "eta": 0.0}
+        if job["started"] is None:
+            if not future.running():
+                return {"status": JobStatus.queued, "progress": 0.0, "eta": None}
+            job["started"] = time.time()
+
+        # estimate the progress from the run time of previous jobs
+        expected = job["steps"] * self.seconds_per_step
+        elapsed = time.time() - job["started"]
+        # never report a running job as done
+        progress = min(elapsed / expected, 0.99)
+        eta = max(expected - elapsed, 0.0)
+        return {"status": JobStatus.running, "progress": progress, "eta": eta}
+
+    def get_result(self, job_id: str) -> tuple:
+        """Get the buffer levels and active periods of a finished job."""
+        buffer_levels, active_periods, _ = self.jobs[job_id]["future"].result()
+        return buffer_levels, active_periods
+
+    def _set_finished(self, job: dict) -> None:
+        # called by the future as soon as the job is done
+        job["finished"] = time.time()
+        if job["future"].exception() is None:
+            _, _, seconds_per_step = job["future"].result()
+            if seconds_per_step is not None:
+                self.seconds_per_step = seconds_per_step
+
+    def _remove_expired(self) -> None:
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job["finished"] is not None and now - job["finished"] > self.ttl:
+                self.jobs.pop(job_id, None)
+
+
+def run_job(scenario: dict, path_active_periods: str) -> tuple:
+    """Simulate a scenario in a worker process (see `JobQueue.submit`)."""
+    cache = SimulationCache(path=".cache")
+    # results from the cache tell nothing about the run time of a simulation
+    is_cached = scenario in cache
+    started = time.time()
+    buffer_levels, _, active_periods = run_pipeline(
+        scenario,
+        path_active_periods=path_active_periods,
+        cache=cache,
+    )
+    steps = scenario.get("simulation_time", 1000)
+    seconds_per_step = None if is_cached else (time.time() - started) / max(steps, 1)
+    # only send back what the app displays, not the events
+    return buffer_levels, active_periods, seconds_per_step
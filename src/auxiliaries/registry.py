@@ -0,0 +1,91 @@
+import threading
+import pandas as pd
+
+from pickle import load
+
+from simulation.files import read_frame
+
+from .storage import to_store_parsed
+from .datasets import get_file_fingerprint
+
+
+def read_results(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, delimiter=";")
+
+
+def read_pickle(path: str) -> object:
+    with open(path, "rb") as file:
+        return load(file)
+
+
+class DataName:
+    # Name for the bundled datasets
+    active_periods = "active-periods"
+    buffer_level = "buffer-level"
+    prediction_results = "prediction-results"
+    prediction_examples = "prediction-examples"
+    # Name for the derived summaries
+    bottleneck_counts = "bottleneck-counts"
+
+
+# Bundled datasets with their files and readers
+BUNDLED_DATA = {
+    DataName.active_periods: ("data/active_periods_10000.npz", read_frame),
+    DataName.buffer_level: ("data/buffer_10000.npz", read_frame),
+    DataName.prediction_results: ("data/results.csv", read_results),
+    DataName.prediction_examples: ("data/results.pkl", read_pickle),
+}
+
+
+class DataRegistry:
+    """
+    Registry of the datasets that are bundled with the app.
+
+    Every bundled dataset is read from file only once (at app startup) and kept
+    in memory in its compact form, e.g. with the compact dtypes of the binary
+    files. Summaries that are derived from a dataset, such as the bottleneck
+    counts of the diagnosis, are calculated once as well. All pages and
+    callbacks share the registry instead of reading the files on every render.
+
+    Parameters:
+        bundled_data (dict): File and reader of every bundled dataset by name.
+    """
+
+    def __init__(self, bundled_data: dict = BUNDLED_DATA):
+        self.bundled_data = bundled_data
+        self._data = {}
+        # summaries read their dataset while the lock is held
+        self._lock = threading.RLock()
+
+    def load(self) -> None:
+        """Read all bundled datasets and their summaries. Missing files are skipped."""
+        for name in [*self.bundled_data, DataName.bottleneck_counts]:
+            try:
+                self.get(name)
+            except FileNotFoundError as error:
+                print(f"Bundled dataset {name} not loaded: {error}")
+
+    def get(self, name: str) -> object:
+        """Get a bundled dataset or summary by name, reading it on first access."""
+        with self._lock:
+            if name not in self._data:
+                self._data[name] = self._read(name)
+            return self._data[name]
+
+    def get_store_data(self, name: str) -> str:
+        """Get the data of a dcc.Store for a bundled dataset (see storage.to_store)."""
+        path, _ = self.bundled_data[name]
+        return to_store_parsed(get_file_fingerprint(path), lambda: self.get(name))
+
+    def _read(self, name: str) -> object:
+        if name == DataName.bottleneck_counts:
+            active_periods = self.get(DataName.active_periods)
+            return active_periods["bottleneck"].value_counts()
+        if name not in self.bundled_data:
+            raise ValueError(f"{name} not accepted")
+        path, reader = self.bundled_data[name]
+        return reader(path)
+
+
+# Bundled datasets, loaded once at app startup
+REGISTRY = DataRegistry()
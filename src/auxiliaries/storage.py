@@ -1,7 +1,14 @@
-from pandas import DataFrame
+import base64
+import pandas as pd
+
+from typing import Callable
+
 from dash.dcc import Store
 
+from simulation.files import to_bytes, from_bytes
+
 from .options import Options
+from .datasets import DatasetStore, get_fingerprint
 
 
 class ConfigName:
@@ -19,8 +26,17 @@ class ConfigName:
     language = "user_language"
     # Name for dict keys (data)
     source = "data-source"
+    job = "data-job"
 
 
+# Server-side store for the datasets, the dcc.Store objects only hold their ids
+DATASETS = DatasetStore(path=".datasets")
+# Set to False to send the datasets through the dcc.Store objects instead (e.g. if
+# the app runs in several processes without a shared dataset directory)
+SERVER_SIDE_DATASETS = True
+# Prefix of datasets that are encoded into a dcc.Store (see encode_frame)
+PAYLOAD_PREFIX = "npz:"
+
 # Get dict with default values for app configuration
 CONFIG_APP = {
     ConfigName.language: Options.language[0],
@@ -31,6 +47,7 @@ CONFIG_APP = {
 # Get dict with default values for data configuration
 CONFIG_DATA = {
     ConfigName.source: Options.selection[0],
+    ConfigName.job: None,
     "sim_process_times": [],
     "sim_buffer_capacity": [],
     "path_to_buffer_levles": "",
@@ -58,60 +75,110 @@ def register_config_data() -> Store:
     )
 
 
-# dcc.Store for the bottleneck analysis:
+# dcc.Store for the bottleneck analysis (see DATASETS):
 
 
 def register_data_buffer_level() -> Store:
-    """Registers a dcc.Store object to save buffer level data as a serialized json object."""
-    # Get empty dataframe to initialize
-    df = DataFrame({}).to_json(orient="split")
+    """Registers a dcc.Store object to save buffer level data as a dataset id or payload (see to_store)."""
+    # Initialize without dataset
     return Store(
         id=ConfigName.buffer_level,
-        data=df,
+        data=None,
         storage_type="session",
     )
 
 
 def register_data_machine_states() -> Store:
-    """Registers a dcc.Store object to save machine state data as a serialized json object."""
-    # Get empty dataframe to initialize
-    df = DataFrame({}).to_json(orient="split")
+    """Registers a dcc.Store object to save machine state data as a dataset id or payload (see to_store)."""
+    # Initialize without dataset
     return Store(
         id=ConfigName.machine_states,
-        data=df,
+        data=None,
         storage_type="session",
     )
 
 
 def register_data_active_periods() -> Store:
-    """Registers a dcc.Store object to save active period data as a serialized json object."""
-    # Get empty dataframe to initialize
-    df = DataFrame({}).to_json(orient="split")
+    """Registers a dcc.Store object to save active period data as a dataset id or payload (see to_store)."""
+    # Initialize without dataset
     return Store(
         id=ConfigName.active_periods,
-        data=df,
+        data=None,
         storage_type="session",
     )
 
 
 # dcc.Store to handle intermediary uploaded user data:
 def register_data_buffer_level_upload() -> Store:
-    """Registers a dcc.Store object to save buffer level data as a serialized json object."""
-    # Get empty dataframe to initialize
-    df = DataFrame({}).to_json(orient="split")
+    """Registers a dcc.Store object to save buffer level data as a dataset id or payload (see to_store)."""
+    # Initialize without dataset
     return Store(
         id=ConfigName.buffer_level_upload,
-        data=df,
+        data=None,
         storage_type="session",
     )
 
 
 def register_data_active_periods_upload() -> Store:
-    """Registers a dcc.Store object to save active period data as a serialized json object."""
-    # Get empty dataframe to initialize
-    df = DataFrame({}).to_json(orient="split")
+    """Registers a dcc.Store object to save active period data as a dataset id or payload (see to_store)."""
+    # Initialize without dataset
     return Store(
         id=ConfigName.active_periods_upload,
-        data=df,
+        data=None,
         storage_type="session",
     )
+
+
+# Serialization of datasets for the dcc.Store objects:
+
+
+def encode_frame(df: pd.DataFrame, compress: bool = True) -> str:
+    """Encodes a DataFrame as base64 string of its binary format (see simulation.files)."""
+    data = base64.b64encode(to_bytes(df, compress=compress)).decode("ascii")
+    return PAYLOAD_PREFIX + data
+
+
+def decode_frame(data: str) -> pd.DataFrame:
+    """Decodes a DataFrame that was encoded with encode_frame."""
+    return from_bytes(base64.b64decode(data[len(PAYLOAD_PREFIX) :]))
+
+
+def to_store(df: pd.DataFrame) -> str:
+    """Gets the data of a dcc.Store for a DataFrame, either its dataset id or the encoded DataFrame."""
+    if SERVER_SIDE_DATASETS:
+        return DATASETS.put(df)
+    return encode_frame(df)
+
+
+def to_store_parsed(fingerprint: str, parse: "Callable[[], pd.DataFrame]") -> str:
+    """Gets the data of a dcc.Store for a payload, parsing it only once if kept on the server."""
+    if SERVER_SIDE_DATASETS:
+        return DATASETS.put_parsed(fingerprint, parse)
+    return encode_frame(parse())
+
+
+def from_store(data: "str | None") -> "pd.DataFrame | None":
+    """Gets the DataFrame from the data of a dcc.Store, or None if there is no dataset."""
+    if data is None:
+        return None
+    return DATASETS.get(get_store_id(data))
+
+
+def pyramid_from_store(data: "str | None") -> "dict | None":
+    """Gets the min/max pyramids of the dataset of a dcc.Store (see DatasetStore), or None."""
+    if data is None:
+        return None
+    return DATASETS.get_pyramid(get_store_id(data))
+
+
+def get_store_id(data: str) -> str:
+    """
+    Gets the dataset id of the data of a dcc.Store.
+
+    Encoded DataFrames (see encode_frame) are decoded only once and then kept in the
+    DatasetStore of this process by the fingerprint of the payload, so that callbacks
+    do not decode the same payload again on every call.
+    """
+    if not data.startswith(PAYLOAD_PREFIX):
+        return data
+    return DATASETS.put_parsed(get_fingerprint(data), lambda: decode_frame(data))
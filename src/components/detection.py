@@ -3,12 +3,16 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from dash import Dash, html
-from dash.dcc import Graph
+from dash import Dash, Patch, html
+from dash.dcc import Graph, Store
 from dash_bootstrap_components import Card, CardBody, Accordion, AccordionItem, Alert
 
 from ..auxiliaries.options import Options
 from ..auxiliaries.storage import ConfigName
+from ..auxiliaries.downsampling import MAX_POINTS, get_visible_rows, downsample_rows
+
+# Number of points per figure above which WebGL is used instead of SVG
+WEBGL_THRESHOLD = 50000
 
 
 class DetectionName:
@@ -18,6 +22,7 @@ class DetectionName:
     acc_buffer_level = "detection-accordion-buffer-level"
     fig_active_periods = "detection-figure-active-periods"
     acc_active_periods = "detection-accordion-active-periods"
+    xaxis_range = "detection-store-xaxis-range"
 
 
 def render(
@@ -141,6 +146,8 @@ def get_visualizations(
                     ),
                     start_collapsed=True,
                 ),
+                # Store x-axis ranges that need new traces (see assets/detection.js)
+                Store(DetectionName.xaxis_range),
             ],
         )
     )
@@ -150,6 +157,7 @@ def plot_bottlenecks(
     df: pd.DataFrame,
     config_app: dict,
     xaxis_range: list = None,
+    webgl_threshold: int = WEBGL_THRESHOLD,
 ):
     """
     Displays the bottleneck states of the selected data set.
@@ -159,6 +167,7 @@ def plot_bottlenecks(
         config_app (dict): A dictionary containing configuration settings for the application.
         config_data (dict): A dictionary containing configuration data.
         xaxis_range (list, optional): The range of x-axis values for the plot. Default is None.
+        webgl_threshold (int, optional): The number of points above which WebGL is used. Default is WEBGL_THRESHOLD.
     """
 
     color_dict = {category: i for i, category in enumerate(df[df.columns[-1]].unique())}
@@ -168,8 +177,9 @@ def plot_bottlenecks(
         template=get_template(config_app),
         range_x=xaxis_range,
     )
+    scatter = get_scatter(len(df), webgl_threshold)
     figure.add_trace(
-        go.Scatter(
+        scatter(
             x=df[df.columns[0]],  # time
             y=df[df.columns[-1]],  # bottlenecks
             mode="markers",
@@ -194,15 +204,26 @@ def plot_buffer_level(
     df: pd.DataFrame,
     config_app: dict,
     xaxis_range: list = None,
+    max_points: int = MAX_POINTS,
+    pyramid: dict = None,
+    webgl_threshold: int = WEBGL_THRESHOLD,
 ):
     """
     Displays the buffer level of the selected data set.
 
+    Only the rows within the x-axis range are sent, reduced to at most `max_points`
+    per trace while keeping their peaks (see downsampling). Once zoomed in far
+    enough, the rows are shown at full resolution. With the min/max pyramids of the
+    dataset, only about `max_points` rows are read per trace, regardless of the range.
+
     Parameters:
         app (Dash): The Dash application instance.
         config_app (dict): A dictionary containing configuration settings for the application.
         config_data (dict): A dictionary containing configuration data.
         xaxis_range (list, optional): The range of x-axis values for the plot. Default is None.
+        max_points (int, optional): The maximum number of points per trace. Default is MAX_POINTS.
+        pyramid (dict, optional): The min/max pyramid of every column. Default is None.
+        webgl_threshold (int, optional): The number of points above which WebGL is used. Default is WEBGL_THRESHOLD.
     """
 
     # Get figure from active periods
@@ -210,15 +231,20 @@ def plot_buffer_level(
         template=get_template(config_app),
         range_x=xaxis_range,
     )
-    for col in df.columns[2:-1]:
+    # Get visible rows only
+    traces = get_buffer_level_traces(df, xaxis_range, max_points, pyramid)
+    scatter = get_scatter(sum(len(y) for _, y in traces.values()), webgl_threshold)
+    for col, (x, y) in traces.items():
         figure.add_trace(
-            go.Scatter(
-                x=df[df.columns[0]],  # time
-                y=df[col],
+            scatter(
+                x=x,  # time
+                y=y,
                 mode="lines",
                 name=col,
             )
         )
+    # Tell the browser which range the traces were downsampled for
+    figure.update_layout(meta=get_meta(df, traces, xaxis_range))
 
     # Update ax labels
     figure.update_xaxes(title_text="Simulation time [t]")
@@ -232,15 +258,26 @@ def plot_active_periods(
     df: pd.DataFrame,
     config_app: dict,
     xaxis_range: list = None,
+    max_points: int = MAX_POINTS,
+    pyramid: dict = None,
+    webgl_threshold: int = WEBGL_THRESHOLD,
 ):
     """
     Displays the active periods of the selected data set.
 
+    Only the rows within the x-axis range are sent, reduced to at most `max_points`
+    per trace while keeping their peaks (see downsampling). Once zoomed in far
+    enough, the rows are shown at full resolution. With the min/max pyramids of the
+    dataset, only about `max_points` rows are read per trace, regardless of the range.
+
     Parameters:
         app (Dash): The Dash application instance.
         config_app (dict): A dictionary containing configuration settings for the application.
         config_data (dict): A dictionary containing configuration data.
         xaxis_range (list, optional): The range of x-axis values for the plot. Default is None.
+        max_points (int, optional): The maximum number of points per trace. Default is MAX_POINTS.
+        pyramid (dict, optional): The min/max pyramid of every column. Default is None.
+        webgl_threshold (int, optional): The number of points above which WebGL is used. Default is WEBGL_THRESHOLD.
     """
 
     # Get figure from active periods
@@ -248,15 +285,20 @@ def plot_active_periods(
         template=get_template(config_app),
         range_x=xaxis_range,
     )
-    for col in df.columns[1:-1]:
+    # Get visible rows only
+    traces = get_active_periods_traces(df, xaxis_range, max_points, pyramid)
+    scatter = get_scatter(sum(len(y) for _, y in traces.values()), webgl_threshold)
+    for col, (x, y) in traces.items():
         figure.add_trace(
-            go.Scatter(
-                x=df[df.columns[0]],  # time
-                y=df[col],
+            scatter(
+                x=x,  # time
+                y=y,
                 mode="lines",
                 name=col,
             )
         )
+    # Tell the browser which range the traces were downsampled for
+    figure.update_layout(meta=get_meta(df, traces, xaxis_range))
 
     # Update ax labels
     figure.update_xaxes(title_text="Simulation time [t]")
@@ -266,6 +308,130 @@ def plot_active_periods(
     return figure
 
 
+def get_buffer_level_traces(
+    df: pd.DataFrame,
+    xaxis_range: list = None,
+    max_points: int = MAX_POINTS,
+    pyramid: dict = None,
+) -> dict:
+    """Get the downsampled time and values of every buffer in the x-axis range (see plot_buffer_level)."""
+    return get_traces(df, df.columns[2:-1], xaxis_range, max_points, pyramid)
+
+
+def get_active_periods_traces(
+    df: pd.DataFrame,
+    xaxis_range: list = None,
+    max_points: int = MAX_POINTS,
+    pyramid: dict = None,
+) -> dict:
+    """Get the downsampled time and values of every station in the x-axis range (see plot_active_periods)."""
+    return get_traces(df, df.columns[1:-1], xaxis_range, max_points, pyramid)
+
+
+def get_traces(
+    df: pd.DataFrame,
+    columns: list,
+    xaxis_range: list = None,
+    max_points: int = MAX_POINTS,
+    pyramid: dict = None,
+) -> dict:
+    time = df[df.columns[0]].to_numpy()
+    rows = get_visible_rows(time, xaxis_range)
+    traces = {}
+    for col in columns:
+        levels = None if pyramid is None else pyramid.get(col)
+        traces[col] = downsample_rows(
+            time, df[col].to_numpy(), rows, max_points, levels
+        )
+    return traces
+
+
+def get_meta(df: pd.DataFrame, traces: dict, xaxis_range: list = None) -> dict:
+    """
+    Get the meta data of a figure with downsampled traces (see get_traces).
+
+    The meta data is kept in the figure layout and read by the clientside callback
+    that syncs the x-axis ranges (see assets/detection.js). Based on it, the server is
+    only asked for new traces if zooming or panning reveals more details.
+
+    Parameters:
+        df (pd.DataFrame): The data of the figure, with the time as first column.
+        traces (dict): The downsampled time and values of every trace.
+        xaxis_range (list, optional): The range the traces were downsampled for. Default is None (all rows).
+
+    Returns:
+        dict: The x-axis range of the traces, the time range of all rows and whether any trace was downsampled.
+    """
+    time = df[df.columns[0]].to_numpy()
+    extent = [time[0].item(), time[-1].item()] if len(time) else [0, 0]
+    rows = get_visible_rows(time, xaxis_range)
+    return {
+        "xaxis_range": extent if xaxis_range is None else list(xaxis_range),
+        "extent": extent,
+        "downsampled": any(len(y) < rows.stop - rows.start for _, y in traces.values()),
+    }
+
+
+def patch_figure(
+    xaxis_range: list,
+    traces: dict = None,
+    meta: dict = None,
+    webgl_threshold: int = WEBGL_THRESHOLD,
+) -> Patch:
+    """
+    Get a partial update of a detection figure for a new x-axis range.
+
+    Instead of the whole figure, only the x-axis range is sent and, if given, the
+    time and values of the traces (e.g. newly downsampled for the visible range).
+
+    Parameters:
+        xaxis_range (list): The new range of x-axis values for the plot, or None to reset it.
+        traces (dict, optional): The time and values of every trace, in the order of the figure. Default is None.
+        meta (dict, optional): The meta data of the traces, see get_meta. Default is None.
+        webgl_threshold (int, optional): The number of points above which WebGL is used. Default is WEBGL_THRESHOLD.
+
+    Returns:
+        Patch: The partial update of the figure.
+    """
+    patch = Patch()
+    if xaxis_range is None:
+        patch["layout"]["xaxis"]["autorange"] = True
+    else:
+        patch["layout"]["xaxis"]["range"] = xaxis_range
+        patch["layout"]["xaxis"]["autorange"] = False
+    if meta is not None:
+        patch["layout"]["meta"] = meta
+    if traces is not None:
+        scatter = get_scatter(sum(len(y) for _, y in traces.values()), webgl_threshold)
+        # encode the values as binary arrays, as in complete figures
+        data = go.Figure(
+            [
+                scatter(x=x, y=y, mode="lines", name=col)
+                for col, (x, y) in traces.items()
+            ]
+        ).to_dict()["data"]
+        for i, trace in enumerate(data):
+            # the first trace is the empty trace of px.scatter
+            patch["data"][i + 1] = trace
+    return patch
+
+
+def get_scatter(num_points: int, webgl_threshold: int = WEBGL_THRESHOLD) -> type:
+    """
+    Get the trace type for a figure with the given number of points.
+
+    Parameters:
+        num_points (int): The total number of points of the figure.
+        webgl_threshold (int, optional): The number of points above which WebGL is used. Default is WEBGL_THRESHOLD.
+
+    Returns:
+        type: go.Scattergl above the threshold (rendered with WebGL), otherwise go.Scatter (rendered as SVG).
+    """
+    if num_points > webgl_threshold:
+        return go.Scattergl
+    return go.Scatter
+
+
 def get_template(config_app: dict) -> str:
     """
     Get the template for visualizations based on the application theme.
@@ -1,5 +1,4 @@
 import i18n
-import pandas as pd
 import plotly.express as px
 
 from dash import Dash, html, dcc
@@ -8,6 +7,7 @@ from dash_bootstrap_components import Card, CardBody, Accordion, AccordionItem,
 
 from ..auxiliaries.options import Options
 from ..auxiliaries.storage import ConfigName
+from ..auxiliaries.registry import REGISTRY, DataName
 
 
 def render(
@@ -119,9 +119,8 @@ def plot_diagnosis(
     """
     Generate visualizations for bottleneck diagnosis.
     """
-    # Load data (later from path)
-    df = pd.read_csv("data/active_periods_10000.csv", nrows=10000)
-    value_counts = df["bottleneck"].value_counts()
+    # Get bottleneck counts of the example data from the registry (later from path)
+    value_counts = REGISTRY.get(DataName.bottleneck_counts)
     figure = px.bar(
         template=get_template(config_app),
         x=value_counts.index,
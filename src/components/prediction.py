@@ -2,13 +2,13 @@ from dash import Dash, html, dcc
 from dash_bootstrap_components import Card, CardBody, CardImg, Row, Col, Button
 
 import i18n
-from pickle import load
-from pandas import DataFrame, read_csv
+from pandas import DataFrame
 from plotly.subplots import make_subplots
 from plotly.graph_objects import Figure, Scatter
 
 from ..auxiliaries.options import Options
 from ..auxiliaries.storage import ConfigName
+from ..auxiliaries.registry import REGISTRY, DataName
 
 
 def render(
@@ -94,8 +94,8 @@ def render_prediction_results(
     config_app: dict,
     config_data: dict,
 ) -> html.Div:
-    # Load results from file for faster visualization
-    df = read_csv("data/results.csv", delimiter=";")
+    # Get prepared results from the registry for faster visualization
+    df = REGISTRY.get(DataName.prediction_results)
 
     return Card(
         id="app-body-content-prediction-results",
@@ -124,9 +124,8 @@ def render_prediction_examples(
     config_app: dict,
     config_data: dict,
 ) -> html.Div:
-    # Read the CSV file
-
-    x_test, y_test, predictions = load_data(path="data/", name="results")
+    # Get prepared examples from the registry
+    x_test, y_test, predictions = REGISTRY.get(DataName.prediction_examples)
 
     return Card(
         id="app-body-content-prediction-examples",
@@ -317,8 +316,3 @@ def get_template(config_app: dict) -> str:
         "dark": "plotly_dark",
     }
     return theme_colors[config_app[ConfigName.theme]]
-
-
-def load_data(path: str, name: str) -> object:
-    file = open(f"{path}{name}.pkl", "rb")
-    return load(file)
@@ -12,10 +12,12 @@ from dash_bootstrap_components import (
     Alert,
     Table,
     Container,
+    Progress,
 )
 
 from ..auxiliaries.options import Options
 from ..auxiliaries.storage import ConfigName
+from ..auxiliaries.jobs import JobStatus
 
 
 class Cards:
@@ -394,3 +396,33 @@ def render_confirmation_button(
                 ],
             ),
         )
+
+
+def render_job_progress(status: dict) -> html.Div:
+    """Display the progress of a background simulation job and poll its status."""
+    return html.Div(
+        children=[
+            html.Div(
+                id="app-body-simulation-job-progress",
+                children=render_job_status(status),
+            ),
+            # poll the status of the job until it is finished
+            dcc.Interval(id="app-body-interval-simulation-job", interval=1000),
+        ],
+    )
+
+
+def render_job_status(status: dict) -> "list":
+    if status["status"] == JobStatus.queued:
+        text = i18n.t("selection.simulation-queued")
+    else:
+        text = i18n.t("selection.simulation-running", eta=round(status["eta"]))
+    return [
+        html.Div(text),
+        Progress(
+            value=round(100 * status["progress"]),
+            striped=True,
+            animated=True,
+            style={"margin-top": "1rem"},
+        ),
+    ]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulation.bottlenecks import (
+    Bottlenecks,
+    IncrementalBottlenecks,
+    calc_active_periods_chunked,
+)
+from simulation.events import get_status
+from simulation.files import write_frame
+from simulation.simulation import run_simulation
+
+
+@pytest.fixture(scope="module")
+def events():
+    _, events = run_simulation(
+        process_times=[2, 2.25, 2, 2.25, 2],
+        simulation_time=500,
+        save_results=False,
+        capa_init=0,
+        capa_max=5,
+        seed=3,
+    )
+    return events
+
+
+@pytest.fixture(scope="module")
+def active_periods(events):
+    return Bottlenecks(events).calc_active_periods()
+
+
+def test_get_status():
+    events = pd.DataFrame(
+        {
+            "t": [0.0, 2.0, 2.0, 2.0, 4.0, 5.0],
+            "num_station": [0, 0, 1, 0, 0, 1],
+            "num_job": [1, 1, 1, 2, 2, 1],
+            "event_type": [
+                "job start",
+                "job finish",
+                "job start",
+                "job start",
+                "job finish",
+                "job finish",
+            ],
+        }
+    )
+    status = ["init", "active", "init", "active", "passive", "passive"]
+    assert get_status(events).tolist() == status
+
+
+@pytest.mark.parametrize("batch_size", [5, 333])
+def test_incremental_equals_full(events, active_periods, batch_size):
+    # the log grows from t=0, downstream stations appear in later batches
+    bottlenecks = IncrementalBottlenecks(station_nums=[0, 1, 2, 3, 4])
+    updates = [
+        bottlenecks.update(events.iloc[start : start + batch_size])
+        for start in range(0, len(events), batch_size)
+    ]
+    result = pd.concat(updates + [bottlenecks.finish()])
+    # empty batches turn the string column of the bottleneck into objects
+    pd.testing.assert_frame_equal(
+        result,
+        active_periods,
+        check_dtype=False,
+        check_index_type=False,
+        check_exact=True,
+    )
+
+
+def test_incremental_rejects_unknown_station(events):
+    bottlenecks = IncrementalBottlenecks(station_nums=[0, 1])
+    with pytest.raises(ValueError, match="not accepted"):
+        bottlenecks.update(events)
+        bottlenecks.finish()
+
+
+@pytest.mark.parametrize("extension", ["csv", "npz"])
+def test_chunked_equals_full(events, active_periods, tmp_path, extension):
+    path_events = str(tmp_path / f"events.{extension}")
+    path_active_periods = str(tmp_path / "active_periods.csv")
+    write_frame(events, path_events)
+    num_steps = calc_active_periods_chunked(
+        path_events, path_active_periods, chunk_size=100
+    )
+    result = pd.read_csv(path_active_periods, index_col=0)
+    assert num_steps == len(active_periods)
+    assert (result["bottleneck"] == active_periods["bottleneck"]).all()
+    columns = [col for col in active_periods.columns if col != "bottleneck"]
+    np.testing.assert_allclose(result[columns], active_periods[columns])
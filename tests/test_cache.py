@@ -0,0 +1,19 @@
+import pandas as pd
+
+from simulation.cache import SimulationCache
+from simulation.simulation import run_pipeline
+
+
+def test_cache_hit_equals_miss(tmp_path):
+    cache = SimulationCache(path=str(tmp_path))
+    scenario = {
+        "process_times": [2, 2.25, 2],
+        "simulation_time": 300,
+        "save_results": False,
+        "seed": 1,
+    }
+    miss = run_pipeline(scenario, cache=cache)
+    assert scenario in cache
+    hit = run_pipeline(scenario, cache=cache)
+    for frame_miss, frame_hit in zip(miss, hit):
+        pd.testing.assert_frame_equal(frame_hit, frame_miss, check_exact=True)
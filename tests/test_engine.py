@@ -0,0 +1,56 @@
+import pytest
+
+from simulation.simulation import run_simulation
+from simulation.replications import run_replications_batch
+
+SCENARIO = {
+    "process_times": [2, 2.25, 2, 2.25, 2],
+    "simulation_time": 2000,
+    "save_results": False,
+    "capa_init": 0,
+    "capa_max": 5,
+    "capa_inf": 100,
+    "seed": 7,
+}
+
+
+@pytest.mark.parametrize(
+    "distribution, dist_params",
+    [("exponential", None), ("gaussian", {"std_dev": 0.1})],
+)
+def test_fast_engine_equals_simpy(distribution, dist_params):
+    results = [
+        run_simulation(
+            **SCENARIO,
+            distribution=distribution,
+            dist_params=dist_params,
+            engine=engine,
+        )
+        for engine in ["simpy", "fast"]
+    ]
+    (buffer_simpy, events_simpy), (buffer_fast, events_fast) = results
+    assert buffer_fast.equals(buffer_simpy)
+    assert (events_fast.astype(str).values == events_simpy.astype(str).values).all()
+
+
+@pytest.mark.parametrize(
+    "distribution, dist_params",
+    [("empirical", {"samples": [1, 2]}), ("gaussian", {"std_dev": 1.0})],
+)
+def test_fast_engine_rejects_simultaneous_events(distribution, dist_params):
+    # process times tie with each other and with the restocking at every step
+    with pytest.raises(ValueError, match="simultaneous events"):
+        run_simulation(
+            **SCENARIO,
+            distribution=distribution,
+            dist_params=dist_params,
+            engine="fast",
+        )
+
+
+def test_replications_batch_rejects_simultaneous_events():
+    scenario = {**SCENARIO, "distribution": "empirical"}
+    scenario["dist_params"] = {"samples": [1, 2]}
+    del scenario["seed"]
+    with pytest.raises(ValueError, match="simultaneous events"):
+        run_replications_batch(scenario, num_replications=2, seed=7)